@@ -0,0 +1,130 @@
+"""
+Benchmark de arranque en frío de la API.
+
+Mide, en procesos nuevos:
+    - tiempo de `import src.api.main`
+    - tiempo desde que se lanza uvicorn hasta la primera respuesta de /health
+    - tiempo de la primera respuesta de /forecast-sales
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.arranque_api --repeticiones 5 --salida arranque.json
+    python -m benchmarks.arranque_api --precalentar
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+from benchmarks.datos_sinteticos import csv_sintetico
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+
+def _puerto_libre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def medir_importacion() -> float:
+    """Segundos que tarda `import src.api.main` en un intérprete nuevo."""
+    codigo = (
+        "import time; t = time.perf_counter(); import src.api.main; "
+        "print(time.perf_counter() - t)"
+    )
+    salida = subprocess.run(
+        [sys.executable, "-c", codigo],
+        cwd=ROOT_DIR, capture_output=True, text=True, check=True
+    )
+    return float(salida.stdout.strip().splitlines()[-1])
+
+
+def medir_servidor(csv: bytes, precalentar: bool, timeout: float = 60.0) -> dict:
+    """
+    Lanza uvicorn y mide el tiempo hasta la primera respuesta de /health y
+    la duración de la primera petición a /forecast-sales.
+    """
+    puerto = _puerto_libre()
+    url = f"http://127.0.0.1:{puerto}"
+    env = dict(os.environ, IASIGHTS_PRECALENTAR="1" if precalentar else "0")
+
+    inicio = time.perf_counter()
+    proceso = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "src.api.main:app", "--port", str(puerto), "--log-level", "warning"],
+        cwd=ROOT_DIR, env=env
+    )
+    try:
+        while True:
+            if time.perf_counter() - inicio > timeout:
+                raise TimeoutError("El servidor no respondió a /health a tiempo.")
+            try:
+                if httpx.get(f"{url}/health", timeout=1).status_code == 200:
+                    break
+            except httpx.HTTPError:
+                time.sleep(0.01)
+        t_health = time.perf_counter() - inicio
+
+        t0 = time.perf_counter()
+        respuesta = httpx.post(
+            f"{url}/forecast-sales",
+            files={"file": ("ventas.csv", csv, "text/csv")},
+            params={"periodo": "ultimos_90_dias", "dias_futuro": 7},
+            timeout=timeout
+        )
+        respuesta.raise_for_status()
+        t_forecast = time.perf_counter() - t0
+    finally:
+        proceso.terminate()
+        proceso.wait()
+
+    return {"primer_health_s": t_health, "primer_forecast_s": t_forecast}
+
+
+def _resumen(valores: list) -> dict:
+    return {
+        "mediana": statistics.median(valores),
+        "min": min(valores),
+        "max": max(valores),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--filas", type=int, default=20_000, help="Filas del CSV sintético")
+    parser.add_argument("--precalentar", action="store_true", help="Activa IASIGHTS_PRECALENTAR=1")
+    parser.add_argument("--salida", help="Archivo JSON donde guardar los resultados")
+    args = parser.parse_args()
+
+    csv = csv_sintetico(args.filas)
+    importaciones, health, forecast = [], [], []
+
+    for _ in range(args.repeticiones):
+        importaciones.append(medir_importacion())
+        medicion = medir_servidor(csv, args.precalentar)
+        health.append(medicion["primer_health_s"])
+        forecast.append(medicion["primer_forecast_s"])
+
+    resultados = {
+        "precalentar": args.precalentar,
+        "filas": args.filas,
+        "repeticiones": args.repeticiones,
+        "import_api_s": _resumen(importaciones),
+        "primer_health_s": _resumen(health),
+        "primer_forecast_s": _resumen(forecast),
+    }
+
+    print(json.dumps(resultados, indent=2))
+    if args.salida:
+        with open(args.salida, "w") as f:
+            json.dump(resultados, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,289 @@
+"""
+Prueba de carga local de la API.
+
+Levanta la app con uvicorn (o usa --url de un servidor ya levantado) y
+reproduce una mezcla configurable de peticiones con CSV sintéticos, en modo
+concurrencia fija (lazo cerrado) o tasa de llegada (Poisson, lazo abierto).
+Reporta throughput, latencias p50/p95/p99 y errores por endpoint, y el RSS
+del servidor (proceso + workers) a lo largo del tiempo.
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.carga_api --concurrencia 50 --duracion 30 \\
+        --mezcla summary=3,ventas-diarias=2,forecast-sales=1,health=4 \\
+        --filas 5000,50000 --salida carga_v1.json
+    python -m benchmarks.carga_api --tasa 20 --duracion 30 --workers 4
+    python -m benchmarks.carga_api --comparar carga_v1.json carga_v2.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+
+import httpx
+import numpy as np
+
+from benchmarks.arranque_api import ROOT_DIR, _puerto_libre
+from benchmarks.datos_sinteticos import csv_sintetico
+
+# endpoint → (método, ruta, parámetros)
+ENDPOINTS = {
+    "health": ("GET", "/health", {}),
+    "summary": ("POST", "/summary", {}),
+    "ventas-diarias": ("POST", "/ventas-diarias", {}),
+    "forecast-sales": ("POST", "/forecast-sales", {"periodo": "ultimos_90_dias", "dias_futuro": 7}),
+}
+
+
+def _parsear_mezcla(texto: str) -> dict:
+    mezcla = {}
+    for parte in texto.split(","):
+        nombre, _, peso = parte.partition("=")
+        if nombre not in ENDPOINTS:
+            raise ValueError(f"Endpoint desconocido en la mezcla: {nombre}")
+        mezcla[nombre] = float(peso or 1)
+    return mezcla
+
+
+# ----------------------------------------------------------
+# Memoria del servidor
+# ----------------------------------------------------------
+
+def _hijos(pid: int) -> list:
+    hijos = []
+    directorio = f"/proc/{pid}/task"
+    if not os.path.isdir(directorio):
+        return hijos
+    for tid in os.listdir(directorio):
+        try:
+            with open(f"{directorio}/{tid}/children") as f:
+                hijos.extend(int(p) for p in f.read().split())
+        except OSError:
+            pass
+    return hijos
+
+
+def rss_total_mb(pid: int) -> float | None:
+    """RSS del proceso y sus descendientes (Linux, /proc). None si no disponible."""
+    total_kb, pendientes, encontrado = 0, [pid], False
+    while pendientes:
+        actual = pendientes.pop()
+        try:
+            with open(f"/proc/{actual}/status") as f:
+                for linea in f:
+                    if linea.startswith("VmRSS:"):
+                        total_kb += int(linea.split()[1])
+                        encontrado = True
+                        break
+        except OSError:
+            continue
+        pendientes.extend(_hijos(actual))
+    return total_kb / 1024 if encontrado else None
+
+
+async def _muestrear_rss(pid: int, inicio: float, muestras: list, intervalo: float = 0.5) -> None:
+    while True:
+        muestras.append({"t_s": time.perf_counter() - inicio, "rss_mb": rss_total_mb(pid)})
+        await asyncio.sleep(intervalo)
+
+
+# ----------------------------------------------------------
+# Generación de carga
+# ----------------------------------------------------------
+
+async def _una_peticion(cliente, nombre: str, archivos: list, registros: list, inicio: float) -> None:
+    metodo, ruta, params = ENDPOINTS[nombre]
+    filas, contenido = random.choice(archivos)
+    t0 = time.perf_counter()
+    try:
+        if metodo == "GET":
+            respuesta = await cliente.get(ruta, params=params)
+        else:
+            respuesta = await cliente.post(
+                ruta, params=params, files={"file": ("ventas.csv", contenido, "text/csv")}
+            )
+        estado = respuesta.status_code
+    except httpx.HTTPError as e:
+        estado = type(e).__name__
+    registros.append({
+        "endpoint": nombre,
+        "filas": None if metodo == "GET" else filas,
+        "inicio_s": t0 - inicio,
+        "latencia_s": time.perf_counter() - t0,
+        "estado": estado,
+    })
+
+
+async def _lazo_cerrado(cliente, mezcla, archivos, concurrencia, duracion, registros, inicio):
+    nombres, pesos = list(mezcla), list(mezcla.values())
+
+    async def usuario():
+        while time.perf_counter() - inicio < duracion:
+            await _una_peticion(cliente, random.choices(nombres, pesos)[0], archivos, registros, inicio)
+
+    await asyncio.gather(*[usuario() for _ in range(concurrencia)])
+
+
+async def _lazo_abierto(cliente, mezcla, archivos, tasa, duracion, registros, inicio):
+    nombres, pesos = list(mezcla), list(mezcla.values())
+    tareas = []
+    while time.perf_counter() - inicio < duracion:
+        nombre = random.choices(nombres, pesos)[0]
+        tareas.append(asyncio.ensure_future(_una_peticion(cliente, nombre, archivos, registros, inicio)))
+        await asyncio.sleep(random.expovariate(tasa))
+    await asyncio.gather(*tareas)
+
+
+async def ejecutar_carga(url, pid, mezcla, archivos, concurrencia, tasa, duracion, timeout) -> dict:
+    registros, rss = [], []
+    limites = httpx.Limits(max_connections=max(concurrencia, 100))
+    async with httpx.AsyncClient(base_url=url, timeout=timeout, limits=limites) as cliente:
+        inicio = time.perf_counter()
+        muestreo = asyncio.ensure_future(_muestrear_rss(pid, inicio, rss)) if pid else None
+        if tasa:
+            await _lazo_abierto(cliente, mezcla, archivos, tasa, duracion, registros, inicio)
+        else:
+            await _lazo_cerrado(cliente, mezcla, archivos, concurrencia, duracion, registros, inicio)
+        total_s = time.perf_counter() - inicio
+        if muestreo:
+            muestreo.cancel()
+    return {"registros": registros, "rss": rss, "total_s": total_s}
+
+
+# ----------------------------------------------------------
+# Reporte
+# ----------------------------------------------------------
+
+def resumir(registros: list, total_s: float) -> dict:
+    """Throughput, percentiles de latencia y tasa de error por endpoint y global."""
+    def _estadisticas(filas):
+        latencias = np.array([r["latencia_s"] for r in filas])
+        errores = sum(1 for r in filas if r["estado"] != 200)
+        p50, p95, p99 = np.percentile(latencias, [50, 95, 99]) if len(latencias) else (None,) * 3
+        return {
+            "peticiones": len(filas),
+            "throughput_rps": len(filas) / total_s if total_s else 0.0,
+            "p50_ms": p50 * 1000 if p50 is not None else None,
+            "p95_ms": p95 * 1000 if p95 is not None else None,
+            "p99_ms": p99 * 1000 if p99 is not None else None,
+            "tasa_error": errores / len(filas) if filas else 0.0,
+        }
+
+    por_endpoint = {}
+    for nombre in sorted({r["endpoint"] for r in registros}):
+        por_endpoint[nombre] = _estadisticas([r for r in registros if r["endpoint"] == nombre])
+    return {"global": _estadisticas(registros), "por_endpoint": por_endpoint}
+
+
+def _imprimir(resumen: dict, rss: list) -> None:
+    print(f"{'endpoint':<16}{'n':>7}{'rps':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'error':>8}")
+    filas = list(resumen["por_endpoint"].items()) + [("TOTAL", resumen["global"])]
+    for nombre, e in filas:
+        print(
+            f"{nombre:<16}{e['peticiones']:>7}{e['throughput_rps']:>9.1f}"
+            f"{e['p50_ms'] or 0:>10.1f}{e['p95_ms'] or 0:>10.1f}{e['p99_ms'] or 0:>10.1f}"
+            f"{e['tasa_error']:>8.1%}"
+        )
+    valores = [m["rss_mb"] for m in rss if m["rss_mb"] is not None]
+    if valores:
+        print(f"RSS servidor: inicio {valores[0]:.0f} MB, máximo {max(valores):.0f} MB, final {valores[-1]:.0f} MB")
+
+
+def comparar(base: str, nuevo: str) -> None:
+    """Diferencias de latencia y throughput entre dos resultados guardados."""
+    with open(base) as f:
+        a = json.load(f)["resumen"]
+    with open(nuevo) as f:
+        b = json.load(f)["resumen"]
+
+    print(f"{'endpoint':<16}{'métrica':<16}{'base':>10}{'nuevo':>10}{'cambio':>9}")
+    nombres = sorted(set(a["por_endpoint"]) | set(b["por_endpoint"])) + ["TOTAL"]
+    for nombre in nombres:
+        ea = a["global"] if nombre == "TOTAL" else a["por_endpoint"].get(nombre)
+        eb = b["global"] if nombre == "TOTAL" else b["por_endpoint"].get(nombre)
+        if not ea or not eb:
+            continue
+        for metrica in ["throughput_rps", "p50_ms", "p95_ms", "p99_ms", "tasa_error"]:
+            va, vb = ea[metrica], eb[metrica]
+            if va is None or vb is None:
+                continue
+            cambio = f"{(vb - va) / va:+.1%}" if va else "-"
+            print(f"{nombre:<16}{metrica:<16}{va:>10.2f}{vb:>10.2f}{cambio:>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="Servidor ya levantado; si se omite se lanza uvicorn local")
+    parser.add_argument("--workers", type=int, default=1, help="Workers de uvicorn (servidor local)")
+    parser.add_argument("--mezcla", default="summary=3,ventas-diarias=2,forecast-sales=1,health=4")
+    parser.add_argument("--filas", default="5000,50000", help="Tamaños de CSV sintético, separados por coma")
+    parser.add_argument("--variantes", type=int, default=3, help="CSV distintos por tamaño (semillas)")
+    parser.add_argument("--concurrencia", type=int, default=10, help="Usuarios simultáneos (lazo cerrado)")
+    parser.add_argument("--tasa", type=float, help="Peticiones por segundo (lazo abierto); ignora --concurrencia")
+    parser.add_argument("--duracion", type=float, default=30.0, help="Segundos de carga")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--etiqueta", default="", help="Versión o descripción guardada con los resultados")
+    parser.add_argument("--salida", help="Archivo JSON donde guardar resultados")
+    parser.add_argument("--comparar", nargs=2, metavar=("BASE", "NUEVO"), help="Compara dos resultados guardados")
+    args = parser.parse_args()
+
+    if args.comparar:
+        comparar(*args.comparar)
+        return
+
+    mezcla = _parsear_mezcla(args.mezcla)
+    archivos = [
+        (int(filas), csv_sintetico(int(filas), semilla=semilla))
+        for filas in args.filas.split(",")
+        for semilla in range(args.variantes)
+    ]
+
+    proceso, url = None, args.url
+    if url is None:
+        puerto = _puerto_libre()
+        url = f"http://127.0.0.1:{puerto}"
+        proceso = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "src.api.main:app", "--port", str(puerto),
+             "--workers", str(args.workers), "--log-level", "warning"],
+            cwd=ROOT_DIR
+        )
+        limite = time.perf_counter() + 60
+        while True:
+            try:
+                if httpx.get(f"{url}/health", timeout=1).status_code == 200:
+                    break
+            except httpx.HTTPError:
+                if time.perf_counter() > limite:
+                    proceso.terminate()
+                    raise TimeoutError("El servidor no respondió a /health a tiempo.")
+                time.sleep(0.05)
+
+    try:
+        resultado = asyncio.run(ejecutar_carga(
+            url, proceso.pid if proceso else None, mezcla, archivos,
+            args.concurrencia, args.tasa, args.duracion, args.timeout
+        ))
+    finally:
+        if proceso:
+            proceso.terminate()
+            proceso.wait()
+
+    resumen = resumir(resultado["registros"], resultado["total_s"])
+    _imprimir(resumen, resultado["rss"])
+
+    if args.salida:
+        with open(args.salida, "w") as f:
+            json.dump({
+                "etiqueta": args.etiqueta,
+                "configuracion": {k: v for k, v in vars(args).items() if k not in ("salida", "comparar")},
+                "resumen": resumen,
+                "rss": resultado["rss"],
+                "registros": resultado["registros"],
+            }, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+
+
+def generar_ventas_sinteticas(
+    n_filas: int = 20_000,
+    dias: int = 180,
+    fecha_inicio: str = "2025-01-01",
+    n_productos: int = 200,
+    n_clientes: int = 2_000,
+    semilla: int = 0
+) -> pd.DataFrame:
+    """
+    Genera un DataFrame de transacciones con el esquema de REQUIRED_COLUMNS,
+    con estacionalidad semanal y horaria aproximada, para benchmarks.
+    """
+    rng = np.random.default_rng(semilla)
+
+    # Más ventas en fin de semana y en horas de comida/tarde
+    fechas_posibles = pd.date_range(fecha_inicio, periods=dias, freq="D")
+    peso_dia = np.where(fechas_posibles.dayofweek >= 5, 1.5, 1.0)
+    fechas = rng.choice(fechas_posibles.values, size=n_filas, p=peso_dia / peso_dia.sum())
+
+    peso_hora = np.array([0.2] * 7 + [1, 1.2, 1, 1, 1.5, 2, 1.8, 1.2, 1, 1.1, 1.5, 1.8, 1.6, 1.2, 0.8, 0.4, 0.2])
+    horas = rng.choice(24, size=n_filas, p=peso_hora / peso_hora.sum())
+    minutos = rng.integers(0, 60, n_filas)
+    segundos = rng.integers(0, 60, n_filas)
+
+    productos = rng.zipf(1.3, n_filas) % n_productos
+    precios_base = np.round(rng.uniform(1, 50, n_productos), 2)
+    cantidades = rng.integers(1, 5, n_filas)
+
+    clientes = rng.integers(0, n_clientes, n_filas).astype(float)
+    clientes[rng.random(n_filas) < 0.3] = np.nan
+
+    df = pd.DataFrame({
+        "invoice_id": rng.integers(0, max(n_filas // 3, 1), n_filas),
+        "transaction_date": pd.DatetimeIndex(fechas).strftime("%Y-%m-%d"),
+        "transaction_time": [f"{h:02d}:{m:02d}:{s:02d}" for h, m, s in zip(horas, minutos, segundos)],
+        "customer_id": clientes,
+        "customer_name": pd.Series(clientes).map(lambda c: f"Cliente {int(c)}" if c == c else None),
+        "product_id": productos,
+        "product_name": [f"Producto {p}" for p in productos],
+        "product_category": np.where(productos % 7 == 0, "Combos", "Categoría " + (productos % 5).astype(str)),
+        "product_quantity": cantidades,
+        "product_unit_price": precios_base[productos],
+    })
+    df["product_subtotal"] = np.round(df["product_quantity"] * df["product_unit_price"], 2)
+    return df
+
+
+def csv_sintetico(n_filas: int = 20_000, **kwargs) -> bytes:
+    """Igual que `generar_ventas_sinteticas`, serializado como CSV en bytes."""
+    return generar_ventas_sinteticas(n_filas, **kwargs).to_csv(index=False).encode("utf-8")
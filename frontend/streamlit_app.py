@@ -1,7 +1,9 @@
 import streamlit as st
 import pandas as pd
+import io
 import sys
 import os
+from concurrent.futures import ThreadPoolExecutor
 import plotly.express as px
 import requests
 
@@ -22,12 +24,25 @@ from src.analytics.basico import (
     top_clientes,
 )
 from src.analytics.periodos import obtener_meses_disponibles
-from src.analytics.filtros import filtrar_por_periodo
+from src.analytics.filtros import filtrar_por_periodo, rango_periodo
+from src.analytics.indice_diario import (
+    comparar_periodos,
+    construir_indice_diario,
+    serie_diaria,
+)
 from src.utils.etiquetas import (
     aplicar_etiquetas,
     formatear_monedas
 )
+from src.analytics.muestreo import (
+    estimar_kpis,
+    estimar_patrones_horarios,
+    estimar_top_productos,
+    estimar_ventas_diarias,
+    muestra_estratificada,
+)
 from src.ml.patrones_horarios import detectar_patrones_horarios
+from src.ml.pronostico_horario import pronosticar_ventas_horarias
 
 # -------------------------------------------------------------------
 # Cargar estilos CSS
@@ -61,7 +76,114 @@ uploaded_file = st.file_uploader("Selecciona tu archivo CSV de ventas", type=["c
 if not uploaded_file:
     st.stop()
 
-df = cargar_csv(uploaded_file)
+
+# -------------------------------------------------------------------
+# VISTA PREVIA RÁPIDA (archivos grandes)
+# -------------------------------------------------------------------
+# Primero se muestran estimaciones a partir de una muestra estratificada por
+# día y hora, tomada mientras se lee el archivo por chunks; la carga exacta
+# corre en segundo plano y, al terminar, la página se recarga con los valores
+# exactos.
+UMBRAL_VISTA_PREVIA_MB = 20
+
+
+@st.cache_resource
+def _ejecutor_segundo_plano():
+    return ThreadPoolExecutor(max_workers=2, thread_name_prefix="calculo-exacto")
+
+
+@st.fragment(run_every=1.0)
+def _esperar_calculo_exacto():
+    if st.session_state["calculo_exacto"].done():
+        st.rerun()
+    st.caption("⏳ Calculando los valores exactos en segundo plano...")
+
+
+vista_previa = st.toggle(
+    "Vista previa rápida (estimaciones con muestra estratificada)",
+    value=uploaded_file.size > UMBRAL_VISTA_PREVIA_MB * 1024 * 1024,
+)
+
+if vista_previa:
+    clave_archivo = (uploaded_file.name, uploaded_file.size)
+    if st.session_state.get("archivo_vista_previa") != clave_archivo:
+        contenido = uploaded_file.getvalue()
+        with st.spinner("Tomando muestra estratificada..."):
+            st.session_state["muestra"] = muestra_estratificada(io.BytesIO(contenido))
+        st.session_state["calculo_exacto"] = _ejecutor_segundo_plano().submit(
+            cargar_csv, io.BytesIO(contenido)
+        )
+        st.session_state["archivo_vista_previa"] = clave_archivo
+
+    if not st.session_state["calculo_exacto"].done():
+        muestra = st.session_state["muestra"]
+        st.warning(
+            f"**Vista previa:** valores estimados a partir de {len(muestra['muestra']):,} de "
+            f"{muestra['n_filas']:,} filas (intervalos del 95 %). Se reemplazan por los "
+            "valores exactos al terminar el cálculo completo."
+        )
+        _esperar_calculo_exacto()
+
+        st.header("2. KPIs principales del negocio (estimados)")
+        kpis_est = estimar_kpis(muestra)
+        col1, col2, col3 = st.columns(3)
+        col1.metric(
+            "Ventas totales",
+            f"≈ ${kpis_est['total_ventas']['valor']:,.0f}",
+            f"± ${kpis_est['total_ventas']['margen']:,.0f}",
+            delta_color="off",
+        )
+        col2.metric(
+            "Facturas únicas",
+            f"≈ {kpis_est['num_facturas_unicas']['valor']:,}",
+            f"± {kpis_est['num_facturas_unicas']['margen']:,.0f}",
+            delta_color="off",
+        )
+        col3.metric(
+            "Productos distintos",
+            f"≈ {kpis_est['num_productos']['valor']:,}",
+            f"± {kpis_est['num_productos']['margen']:,.0f}",
+            delta_color="off",
+        )
+
+        st.subheader("Top productos por ingreso generado (estimado)")
+        st.dataframe(aplicar_etiquetas(formatear_monedas(estimar_top_productos(muestra, n=5))))
+
+        st.header("3. Comportamiento histórico de ventas (estimado)")
+        fig_est = px.bar(
+            estimar_ventas_diarias(muestra),
+            x="transaction_date",
+            y="total_ventas",
+            error_y="margen",
+            labels={"transaction_date": "Fecha", "total_ventas": "Ventas Totales (estimadas)"},
+            title="Ventas diarias estimadas con intervalo del 95 %",
+        )
+        st.plotly_chart(fig_est, width="stretch")
+
+        st.header("5. Patrones de demanda por día y horario (estimados)")
+        patrones_est = estimar_patrones_horarios(muestra)
+        heat_est = (
+            patrones_est.pivot_table(
+                index="Día", columns="Franja horaria", values="Ventas totales", aggfunc="sum"
+            )
+            .fillna(0)
+            .reindex(["Lunes", "Martes", "Miércoles", "Jueves", "Viernes", "Sábado", "Domingo"])
+        )
+        fig_hm_est = px.imshow(
+            heat_est,
+            color_continuous_scale="Turbo",
+            labels={"x": "Franja horaria", "y": "Día", "color": "Ventas (estimadas)"},
+            aspect="auto",
+        )
+        st.plotly_chart(fig_hm_est, width="stretch")
+        con_ventas = patrones_est[patrones_est["Ventas totales"] > 0]
+        margen_max = (con_ventas["margen"] / con_ventas["Ventas totales"]).max()
+        st.caption(f"Margen máximo de una celda: ±{margen_max:.1%} (95 %).")
+        st.stop()
+
+    df = st.session_state["calculo_exacto"].result()
+else:
+    df = cargar_csv(uploaded_file)
 
 # Muestra vista previa con etiquetas
 st.subheader("Vista previa del archivo")
@@ -161,9 +283,33 @@ periodo = opciones_periodo[seleccion]   # ← valor real que se usa en el backen
 
 df_filtrado = filtrar_por_periodo(df, periodo)
 
-ventas_periodo = ventas_diarias(df_filtrado)
+# Índice diario acumulado: la serie del periodo y las comparaciones salen de
+# dos lecturas por rango, sin reagrupar las transacciones.
+indice_diario = construir_indice_diario(df)
+inicio_periodo, fin_periodo = rango_periodo(df["transaction_date"], periodo)
+
+ventas_periodo = serie_diaria(indice_diario, inicio_periodo, fin_periodo)
 ventas_periodo_form = aplicar_etiquetas(formatear_monedas(ventas_periodo))
 
+comparaciones = {
+    "vs. periodo anterior": comparar_periodos(indice_diario, inicio_periodo, fin_periodo, "anterior"),
+    "vs. año anterior": comparar_periodos(indice_diario, inicio_periodo, fin_periodo, "anio_anterior"),
+}
+
+cols_comp = st.columns(len(comparaciones))
+for col, (etiqueta, comp) in zip(cols_comp, comparaciones.items()):
+    ventas_comp = comp["metricas"]["ventas"]
+    with col:
+        if comp["referencia"]["cobertura"] == 0:
+            st.metric(f"Ventas {etiqueta}", f"${ventas_comp['actual']:,.2f}", "sin datos de referencia", delta_color="off")
+        else:
+            variacion = ventas_comp["variacion_pct"]
+            st.metric(
+                f"Ventas {etiqueta}",
+                f"${ventas_comp['actual']:,.2f}",
+                f"{variacion:+.1f}%" if variacion is not None else None,
+            )
+
 fig2 = px.line(
     ventas_periodo_form,
     x="Fecha",
@@ -224,6 +370,32 @@ else:
     )
     st.plotly_chart(fig_hm, width="stretch")
 
+    # Pronóstico por hora de la próxima semana (planificación de turnos)
+    st.subheader("Pronóstico por hora para los próximos 7 días")
+    pronostico_horario = pronosticar_ventas_horarias(df_filtrado)
+    grilla_horaria = pronostico_horario["grilla"]
+
+    if grilla_horaria.empty:
+        st.info(pronostico_horario["metricas_modelo"]["mensaje"])
+    else:
+        heat_pron = grilla_horaria.drop(columns=["Día"])
+        heat_pron.index = [
+            f"{dia} {fecha:%d/%m}" for fecha, dia in zip(grilla_horaria.index, grilla_horaria["Día"])
+        ]
+        heat_pron.columns = [f"{h:02d}:00" for h in heat_pron.columns]
+
+        fig_pron = px.imshow(
+            heat_pron,
+            color_continuous_scale="Turbo",
+            labels={"x": "Hora", "y": "Día", "color": "Ventas previstas"},
+            aspect="auto",
+        )
+        st.plotly_chart(fig_pron, width="stretch")
+
+        wape = pronostico_horario["metricas_modelo"]["wape_validacion"]
+        if wape is not None:
+            st.caption(f"Error medio en la última semana del histórico (WAPE): {wape:.1%}")
+
     # Top franjas de mayor demanda
     st.subheader("Franjas con mayor demanda (Pico)")
     top_pico = (
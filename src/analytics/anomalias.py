@@ -0,0 +1,196 @@
+import numpy as np
+import pandas as pd
+
+from .basico import ventas_diarias
+from src.ml.patrones_horarios import DIAS, bucket_hora
+
+# ==========================================================
+# Detección en línea de anomalías de ventas
+# ==========================================================
+#
+# Cada serie guarda un estado pequeño por "slot" (día de la semana, o día de
+# la semana × franja horaria): media y varianza con suavizado exponencial
+# (EWMA) y número de observaciones. Cada punto nuevo se evalúa contra el nivel
+# esperado de su slot y actualiza el estado en O(1), así que al llegar un día
+# nuevo no se recalcula el histórico.
+
+ANCHO_FRANJA = 3
+N_FRANJAS = 24 // ANCHO_FRANJA
+
+
+def estado_anomalias_nuevo(
+    n_slots: int,
+    alpha: float = 0.1,
+    umbral: float = 3.0,
+    minimo_obs: int = 4
+) -> dict:
+    """
+    Estado vacío.
+
+    Params:
+        n_slots: 7 (diario por día de semana) o 7 × N_FRANJAS (horario).
+        alpha: peso de la observación nueva en la media/varianza EWMA.
+        umbral: |z| a partir del cual un punto se marca como anomalía.
+        minimo_obs: observaciones del slot antes de empezar a marcar.
+    """
+    return {
+        "alpha": alpha,
+        "umbral": umbral,
+        "minimo_obs": minimo_obs,
+        "media": np.zeros(n_slots),
+        "varianza": np.zeros(n_slots),
+        "n": np.zeros(n_slots, dtype=np.int64),
+        "ultima_fecha": None,
+    }
+
+
+def actualizar_anomalia(estado: dict, slot: int, valor: float) -> dict:
+    """
+    Evalúa `valor` contra el nivel esperado del slot y actualiza el estado.
+
+    Returns:
+        dict con esperado, desviacion, z (None durante el calentamiento) y anomalia.
+    """
+    n = estado["n"][slot]
+    media = estado["media"][slot]
+    desviacion = max(np.sqrt(estado["varianza"][slot]), 0.1 * abs(media), 1e-9)
+
+    z = None
+    anomalia = False
+    if n >= estado["minimo_obs"]:
+        z = (valor - media) / desviacion
+        anomalia = abs(z) > estado["umbral"]
+
+    # Un pico aislado no debe arrastrar el nivel esperado: se actualiza con el
+    # valor recortado a ±umbral desviaciones.
+    if anomalia:
+        valor = media + np.sign(z) * estado["umbral"] * desviacion
+
+    # Mientras hay pocas observaciones se usa la media acumulada
+    alpha = max(estado["alpha"], 1.0 / (n + 1))
+    diferencia = valor - media
+    estado["media"][slot] = media + alpha * diferencia
+    estado["varianza"][slot] = (1 - alpha) * (estado["varianza"][slot] + alpha * diferencia ** 2)
+    estado["n"][slot] = n + 1
+
+    return {
+        "esperado": float(media) if n > 0 else None,
+        "desviacion": float(desviacion) if n > 0 else None,
+        "z": float(z) if z is not None else None,
+        "anomalia": bool(anomalia),
+    }
+
+
+def _evaluar_serie(serie: pd.DataFrame, estado: dict, columna_valor: str) -> pd.DataFrame:
+    """Recorre la serie (ya ordenada y con columna `slot`) actualizando el estado."""
+    filas = [
+        actualizar_anomalia(estado, int(slot), float(valor))
+        for slot, valor in zip(serie["slot"], serie[columna_valor])
+    ]
+    resultado = pd.concat(
+        [serie.drop(columns=["slot"]).reset_index(drop=True), pd.DataFrame(filas)],
+        axis=1,
+    )
+    # Durante el calentamiento los valores son None: columnas float con NaN
+    # (si toda la serie está en calentamiento, pandas las dejaría como object)
+    for columna in ("esperado", "desviacion", "z"):
+        resultado[columna] = resultado[columna].astype(np.float64)
+    resultado["tipo"] = np.where(
+        resultado["anomalia"],
+        np.where(resultado[columna_valor] > resultado["esperado"], "alta", "baja"),
+        None,
+    )
+    return resultado
+
+
+def detectar_anomalias_diarias(df: pd.DataFrame, estado: dict | None = None, **parametros) -> tuple:
+    """
+    Anomalías en ventas diarias, con nivel esperado por día de la semana.
+    Los días sin ventas dentro del rango cuentan como 0 (ej: caída del POS).
+
+    Params:
+        estado: estado previo; solo se procesan los días posteriores a su
+            `ultima_fecha`. Si es None se crea uno con `parametros`.
+
+    Returns:
+        (DataFrame [transaction_date, Día, total_ventas, esperado, desviacion,
+         z, anomalia, tipo], estado actualizado)
+    """
+    estado = estado or estado_anomalias_nuevo(7, **parametros)
+
+    diario = ventas_diarias(df)
+    if estado["ultima_fecha"] is not None:
+        diario = diario[diario["transaction_date"] > estado["ultima_fecha"]]
+    if diario.empty:
+        return pd.DataFrame(), estado
+
+    inicio = diario["transaction_date"].min()
+    if estado["ultima_fecha"] is not None:
+        inicio = estado["ultima_fecha"] + pd.Timedelta(days=1)
+    fechas = pd.date_range(inicio, diario["transaction_date"].max(), freq="D")
+    diario = (
+        diario.set_index("transaction_date")
+              .reindex(fechas, fill_value=0.0)
+              .rename_axis("transaction_date")
+              .reset_index()
+    )
+    diario["slot"] = diario["transaction_date"].dt.dayofweek
+    diario.insert(1, "Día", diario["slot"].map(DIAS))
+
+    resultado = _evaluar_serie(diario, estado, "total_ventas")
+    estado["ultima_fecha"] = fechas.max()
+    return resultado, estado
+
+
+def detectar_anomalias_horarias(df: pd.DataFrame, estado: dict | None = None, **parametros) -> tuple:
+    """
+    Anomalías por fecha y franja horaria, con el nivel esperado de cada
+    combinación Día × Franja horaria (las mismas celdas que
+    `detectar_patrones_horarios`). Solo se evalúan las franjas con ventas en
+    algún momento; dentro de ellas, una franja sin ventas cuenta como 0.
+
+    Returns:
+        (DataFrame [transaction_date, Día, Franja horaria, total_ventas,
+         esperado, desviacion, z, anomalia, tipo], estado actualizado)
+    """
+    estado = estado or estado_anomalias_nuevo(7 * N_FRANJAS, **parametros)
+
+    fechas = pd.to_datetime(df["transaction_date"], errors="coerce").dt.normalize()
+    horas = pd.to_datetime(
+        df["transaction_time"].astype(str), format="%H:%M:%S", errors="coerce"
+    ).dt.hour
+    validos = fechas.notna() & horas.notna()
+    if estado["ultima_fecha"] is not None:
+        validos &= fechas > estado["ultima_fecha"]
+    if not validos.any():
+        return pd.DataFrame(), estado
+
+    franja = (horas[validos] // ANCHO_FRANJA).astype(int)
+    agregado = (
+        pd.to_numeric(df.loc[validos, "product_subtotal"], errors="coerce").fillna(0)
+          .groupby([fechas[validos], franja]).sum()
+    )
+
+    # Grilla densa fecha × franjas activas: las del lote y las que ya tienen
+    # historia en el estado. En modo incremental arranca el día siguiente a
+    # `ultima_fecha`, así una caída total justo después también se evalúa.
+    historicas = np.flatnonzero(estado["n"].reshape(7, N_FRANJAS).sum(axis=0) > 0)
+    franjas_activas = np.union1d(franja.unique(), historicas)
+    inicio = agregado.index.levels[0].min()
+    if estado["ultima_fecha"] is not None:
+        inicio = estado["ultima_fecha"] + pd.Timedelta(days=1)
+    grilla = pd.MultiIndex.from_product(
+        [pd.date_range(inicio, agregado.index.levels[0].max(), freq="D"), franjas_activas],
+        names=["transaction_date", "franja"],
+    )
+    serie = agregado.reindex(grilla, fill_value=0.0).rename("total_ventas").reset_index()
+
+    dia_semana = serie["transaction_date"].dt.dayofweek
+    serie["slot"] = dia_semana * N_FRANJAS + serie["franja"]
+    serie.insert(1, "Día", dia_semana.map(DIAS))
+    serie.insert(2, "Franja horaria", (serie["franja"] * ANCHO_FRANJA).map(lambda h: bucket_hora(h, ANCHO_FRANJA)))
+    serie = serie.drop(columns=["franja"])
+
+    resultado = _evaluar_serie(serie, estado, "total_ventas")
+    estado["ultima_fecha"] = serie["transaction_date"].max()
+    return resultado, estado
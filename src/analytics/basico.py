@@ -1,9 +1,15 @@
 import pandas as pd
 
-def resumen_general(df: pd.DataFrame) -> dict:
+from .distintos import PRECISION_HLL, contar_distintos, sketches_distintos
+from .top_k import CAPACIDAD_TOP_K, UMBRAL_EXACTO, claves_candidatas
+
+def resumen_general(df: pd.DataFrame, aproximado: bool = False, precision: int = PRECISION_HLL) -> dict:
     """
     Calcula métricas globales del dataset de ventas.
 
+    Con aproximado=True las facturas y productos únicos se estiman con
+    sketches HyperLogLog (ver `src.analytics.distintos`).
+
     Returns:
         dict con:
             total_ventas: float
@@ -16,9 +22,16 @@ def resumen_general(df: pd.DataFrame) -> dict:
     """
     total_ventas = df["product_subtotal"].sum()
     num_transacciones = len(df)
-    num_facturas_unicas = df["invoice_id"].nunique()
+    if aproximado:
+        distintos = contar_distintos(
+            sketches_distintos(df, ["invoice_id", "product_id"], precision=precision)
+        )
+        num_facturas_unicas = distintos["invoice_id"]
+        num_productos = distintos["product_id"]
+    else:
+        num_facturas_unicas = df["invoice_id"].nunique()
+        num_productos = df["product_id"].nunique()
     num_clientes_conocidos = df["customer_id"].notna().sum()
-    num_productos = df["product_id"].nunique()
     fecha_min = df["transaction_date"].min().date().isoformat()
     fecha_max = df["transaction_date"].max().date().isoformat()
 
@@ -48,7 +61,7 @@ def ventas_diarias(df: pd.DataFrame) -> pd.DataFrame:
     )
     return df_grouped
 
-def calcular_kpis_generales(df: pd.DataFrame) -> dict:
+def calcular_kpis_generales(df: pd.DataFrame, aproximado: bool = False, precision: int = PRECISION_HLL) -> dict:
     """
     Calcula KPIs globales a partir del detalle de ventas.
     Asume columnas:
@@ -56,6 +69,8 @@ def calcular_kpis_generales(df: pd.DataFrame) -> dict:
     - customer_id
     - product_id
     - product_subtotal
+
+    Con aproximado=True los conteos de distintos se estiman con HyperLogLog.
     """
     df_limpio = df.copy()
 
@@ -66,14 +81,19 @@ def calcular_kpis_generales(df: pd.DataFrame) -> dict:
 
     monto_total = df_limpio["product_subtotal"].sum()
 
-    n_facturas = df_limpio["invoice_id"].nunique()
-
     n_clientes_registrados = df_limpio["customer_id"].notna().sum()
-    n_clientes_unicos = df_limpio["customer_id"].nunique() - (
-        1 if df_limpio["customer_id"].isna().any() else 0
-    )
 
-    n_productos = df_limpio["product_id"].nunique()
+    if aproximado:
+        distintos = contar_distintos(sketches_distintos(df_limpio, precision=precision))
+        n_facturas = distintos["invoice_id"]
+        n_clientes_unicos = distintos["customer_id"]
+        n_productos = distintos["product_id"]
+    else:
+        n_facturas = df_limpio["invoice_id"].nunique()
+        n_clientes_unicos = df_limpio["customer_id"].nunique() - (
+            1 if df_limpio["customer_id"].isna().any() else 0
+        )
+        n_productos = df_limpio["product_id"].nunique()
 
     ticket_promedio = monto_total / n_facturas if n_facturas > 0 else 0.0
 
@@ -96,7 +116,14 @@ def top_productos(df: pd.DataFrame, n: int = 5) -> pd.DataFrame:
     - product_category
     - product_quantity
     - product_subtotal
+
+    Con más de UMBRAL_EXACTO filas solo se agregan los productos candidatos
+    del resumen top-K (ver top_k.claves_candidatas).
     """
+    if len(df) > UMBRAL_EXACTO:
+        candidatos = claves_candidatas(df, "producto", ["ingreso"], capacidad=max(CAPACIDAD_TOP_K, n))
+        df = df[df["product_id"].isin(candidatos) | df["product_id"].isna()]
+
     df_limpio = df.copy()
     df_limpio["product_subtotal"] = pd.to_numeric(
         df_limpio["product_subtotal"], errors="coerce"
@@ -132,7 +159,14 @@ def top_clientes(df: pd.DataFrame, n: int = 10) -> pd.DataFrame:
     - customer_name
     - invoice_id
     - product_subtotal
+
+    Con más de UMBRAL_EXACTO filas solo se agregan los clientes candidatos
+    de los resúmenes top-K por facturas e ingreso.
     """
+    if len(df) > UMBRAL_EXACTO:
+        candidatos = claves_candidatas(df, "cliente", ["facturas", "ingreso"], capacidad=max(CAPACIDAD_TOP_K, n))
+        df = df[df["customer_id"].isin(candidatos)]
+
     df_limpio = df.copy()
     df_limpio["product_subtotal"] = pd.to_numeric(
         df_limpio["product_subtotal"], errors="coerce"
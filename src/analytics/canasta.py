@@ -0,0 +1,148 @@
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+# ==========================================================
+# Análisis de canasta: productos que se venden juntos
+# ==========================================================
+#
+# Para cada chunk se construye la matriz de incidencia factura × producto
+# (binaria, dispersa) B y se acumula C += Bᵀ·B. C[i, j] es el número de
+# facturas que contienen ambos productos y la diagonal C[i, i] el número de
+# facturas con el producto i. Soporte, confianza y lift salen de C sin
+# cruces de pares en pandas.
+#
+# Nota: se asume que una factura no se reparte entre chunks.
+
+
+def estado_canasta_nuevo() -> dict:
+    """Estado vacío para `actualizar_canasta`."""
+    return {
+        "productos": pd.Index([]),
+        "nombres": pd.Series(dtype=object),
+        "coocurrencias": sparse.csr_matrix((0, 0), dtype=np.int64),
+        "n_facturas": 0,
+    }
+
+
+def actualizar_canasta(estado: dict, df: pd.DataFrame) -> dict:
+    """
+    Acumula las co-ocurrencias de un chunk de transacciones.
+
+    Asume columnas:
+    - invoice_id
+    - product_id
+    - product_name
+    """
+    df = df[df["invoice_id"].notna() & df["product_id"].notna()]
+    if df.empty:
+        return estado
+
+    # Códigos enteros de producto (los nuevos se agregan al final)
+    productos_chunk, inversos = np.unique(df["product_id"].to_numpy(), return_inverse=True)
+    productos = estado["productos"].append(pd.Index(productos_chunk).difference(estado["productos"]))
+    codigos_producto = productos.get_indexer(productos_chunk)[inversos]
+    codigos_factura, facturas = pd.factorize(df["invoice_id"])
+
+    n_productos = len(productos)
+    incidencia = sparse.csr_matrix(
+        (np.ones(len(df), dtype=np.int64), (codigos_factura, codigos_producto)),
+        shape=(len(facturas), n_productos),
+    )
+    # Una factura cuenta una sola vez por producto aunque tenga varias líneas
+    incidencia.sum_duplicates()
+    incidencia.data[:] = 1
+
+    coocurrencias = estado["coocurrencias"].copy()
+    coocurrencias.resize((n_productos, n_productos))
+    coocurrencias = coocurrencias + (incidencia.T @ incidencia).tocsr()
+
+    nombres = df.groupby("product_id")["product_name"].first()
+    nombres = pd.concat([estado["nombres"], nombres[~nombres.index.isin(estado["nombres"].index)]])
+
+    return {
+        "productos": productos,
+        "nombres": nombres,
+        "coocurrencias": coocurrencias,
+        "n_facturas": estado["n_facturas"] + len(facturas),
+    }
+
+
+def calcular_canasta(chunks) -> dict:
+    """
+    Estado de canasta para un DataFrame o un iterable de chunks
+    (ej: `pd.read_csv(..., chunksize=...)`).
+    """
+    if isinstance(chunks, pd.DataFrame):
+        chunks = [chunks]
+    estado = estado_canasta_nuevo()
+    for chunk in chunks:
+        estado = actualizar_canasta(estado, chunk)
+    return estado
+
+
+def pares_relacionados(
+    estado: dict,
+    soporte_minimo: float = 0.001,
+    top_n: int = 5,
+    product_id=None
+) -> pd.DataFrame:
+    """
+    Top N productos relacionados por producto, ordenados por lift.
+
+    Params:
+        soporte_minimo: proporción mínima de facturas que deben contener el par
+            (y cada producto); los pares por debajo se descartan antes de
+            calcular métricas.
+        top_n: pares por producto.
+        product_id: si se indica, solo los pares de ese producto.
+
+    Columns:
+        product_id, product_name, product_id_relacionado, product_name_relacionado,
+        n_facturas_juntos, soporte, confianza, lift
+    """
+    columnas = [
+        "product_id", "product_name", "product_id_relacionado", "product_name_relacionado",
+        "n_facturas_juntos", "soporte", "confianza", "lift",
+    ]
+    n_facturas = estado["n_facturas"]
+    if n_facturas == 0:
+        return pd.DataFrame(columns=columnas)
+
+    minimo = max(int(np.ceil(soporte_minimo * n_facturas)), 1)
+    c = estado["coocurrencias"]
+    frecuencia = c.diagonal()
+
+    # Poda por soporte mínimo sobre la matriz dispersa y sin la diagonal
+    pares = sparse.triu(c, k=1).tocoo()
+    vigentes = pares.data >= minimo
+    i, j, juntos = pares.row[vigentes], pares.col[vigentes], pares.data[vigentes]
+
+    # Cada par cuenta en ambas direcciones (a → b y b → a)
+    origen = np.concatenate([i, j])
+    destino = np.concatenate([j, i])
+    juntos = np.concatenate([juntos, juntos]).astype(np.float64)
+
+    if product_id is not None:
+        codigo = estado["productos"].get_indexer([product_id])[0]
+        mascara = origen == codigo
+        origen, destino, juntos = origen[mascara], destino[mascara], juntos[mascara]
+
+    resultado = pd.DataFrame({
+        "product_id": estado["productos"][origen],
+        "product_id_relacionado": estado["productos"][destino],
+        "n_facturas_juntos": juntos.astype(np.int64),
+        "soporte": juntos / n_facturas,
+        "confianza": juntos / frecuencia[origen],
+        "lift": juntos * n_facturas / (frecuencia[origen].astype(np.float64) * frecuencia[destino]),
+    })
+
+    resultado = (
+        resultado.sort_values(["product_id", "lift"], ascending=[True, False])
+                 .groupby("product_id", sort=False)
+                 .head(top_n)
+                 .reset_index(drop=True)
+    )
+    resultado.insert(1, "product_name", resultado["product_id"].map(estado["nombres"]))
+    resultado.insert(3, "product_name_relacionado", resultado["product_id_relacionado"].map(estado["nombres"]))
+    return resultado[columnas]
@@ -1,10 +1,11 @@
+import numpy as np
 import pandas as pd
 
 def clientes_recurrentes(df: pd.DataFrame, min_visitas: int = 2) -> pd.DataFrame:
     """
     Devuelve clientes conocidos (no null) con al menos min_visitas facturas.
     """
-    df_conocidos = df[df["customer_id"].notna()].copy()
+    df_conocidos = df[df["customer_id"].notna()]
 
     agg = (
         df_conocidos.groupby(["customer_id", "customer_name"], as_index=False)
@@ -26,7 +27,7 @@ def resumen_clientes(df: pd.DataFrame) -> dict:
     """
     Métricas generales sobre clientes.
     """
-    df_conocidos = df[df["customer_id"].notna()].copy()
+    df_conocidos = df[df["customer_id"].notna()]
 
     num_clientes_unicos = df_conocidos["customer_id"].nunique()
     total_ventas_clientes_conocidos = df_conocidos["product_subtotal"].sum()
@@ -34,4 +35,215 @@ def resumen_clientes(df: pd.DataFrame) -> dict:
     return {
         "num_clientes_unicos": int(num_clientes_unicos),
         "total_ventas_clientes_conocidos": float(total_ventas_clientes_conocidos),
-    }
\ No newline at end of file
+    }
+
+# ==========================================================
+# RFM y cohortes de adquisición/retención
+# ==========================================================
+#
+# El estado guarda, por cliente (código entero = posición en `clientes`):
+# primera y última compra, número de facturas y monto; y por cohorte la
+# cantidad de clientes activos en cada mes desde su adquisición. Todo se
+# calcula con operaciones vectorizadas sobre códigos enteros, y meses nuevos
+# se incorporan con `actualizar_estado_clientes` sin recalcular el histórico.
+
+SEGMENTOS_RFM = ["Campeones", "Leales", "Nuevos", "En riesgo", "Perdidos", "Potenciales"]
+
+
+def estado_clientes_nuevo() -> dict:
+    """Estado vacío para `actualizar_estado_clientes`."""
+    return {
+        "clientes": pd.Index([]),
+        "primera_compra": np.array([], dtype="datetime64[D]"),
+        "ultima_compra": np.array([], dtype="datetime64[D]"),
+        "frecuencia": np.array([], dtype=np.int64),
+        "monetario": np.array([], dtype=np.float64),
+        "cohorte": np.array([], dtype=np.int64),
+        "activos": np.zeros((0, 0), dtype=np.int64),
+        "mes_base": None,
+        "ultimo_mes": None,
+    }
+
+
+def _mes_ordinal(fechas: np.ndarray) -> np.ndarray:
+    """datetime64 → meses desde 1970-01 (entero)."""
+    return fechas.astype("datetime64[M]").astype(np.int64)
+
+
+def actualizar_estado_clientes(estado: dict, df: pd.DataFrame) -> dict:
+    """
+    Incorpora transacciones de clientes conocidos al estado.
+    Los meses nuevos deben ser posteriores al último mes del estado (refresco
+    incremental al llegar meses nuevos); para recalcular desde cero usar
+    `estado_clientes_nuevo()`.
+
+    Asume columnas:
+    - customer_id
+    - invoice_id
+    - transaction_date
+    - product_subtotal
+    """
+    df = df[df["customer_id"].notna()]
+    if df.empty:
+        return estado
+
+    fechas = pd.to_datetime(df["transaction_date"]).to_numpy().astype("datetime64[D]")
+    meses = _mes_ordinal(fechas)
+    if estado["ultimo_mes"] is not None and meses.min() <= estado["ultimo_mes"]:
+        raise ValueError("Los datos nuevos deben pertenecer a meses posteriores al estado actual.")
+
+    # Códigos enteros de cliente; los clientes nuevos se agregan al final
+    clientes_chunk, inversos = np.unique(df["customer_id"].to_numpy(), return_inverse=True)
+    nuevos = pd.Index(clientes_chunk).difference(estado["clientes"])
+    clientes = estado["clientes"].append(nuevos)
+    codigos = clientes.get_indexer(clientes_chunk)[inversos]
+    n, n_previos = len(clientes), len(estado["clientes"])
+
+    def _extender(arr, relleno):
+        return np.concatenate([arr, np.full(n - n_previos, relleno, dtype=arr.dtype)])
+
+    primera = _extender(estado["primera_compra"], np.datetime64("NaT"))
+    ultima = _extender(estado["ultima_compra"], np.datetime64("NaT"))
+    frecuencia = _extender(estado["frecuencia"], 0)
+    monetario = _extender(estado["monetario"], 0.0)
+    cohorte = _extender(estado["cohorte"], np.iinfo(np.int64).max)
+
+    # Primera/última compra del chunk por cliente
+    dias = fechas.astype(np.int64)
+    min_chunk = np.full(n, np.iinfo(np.int64).max)
+    max_chunk = np.full(n, np.iinfo(np.int64).min)
+    np.minimum.at(min_chunk, codigos, dias)
+    np.maximum.at(max_chunk, codigos, dias)
+    presentes = max_chunk > np.iinfo(np.int64).min
+
+    es_nuevo = np.arange(n) >= n_previos
+    primera[es_nuevo] = min_chunk[es_nuevo].astype("datetime64[D]")
+    ultima[presentes] = max_chunk[presentes].astype("datetime64[D]")
+    cohorte[es_nuevo] = _mes_ordinal(primera[es_nuevo])
+
+    # Frecuencia = facturas distintas; monetario = suma de subtotales
+    facturas = pd.factorize(df["invoice_id"])[0]
+    pares = np.unique(codigos.astype(np.int64) * (facturas.max() + 1) + facturas)
+    frecuencia += np.bincount(pares // (facturas.max() + 1), minlength=n)
+    monetario += np.bincount(
+        codigos,
+        weights=pd.to_numeric(df["product_subtotal"], errors="coerce").fillna(0).to_numpy(),
+        minlength=n
+    )
+
+    # Matriz cohorte × meses desde la adquisición (clientes activos distintos)
+    mes_base = cohorte.min() if estado["mes_base"] is None else estado["mes_base"]
+    ultimo_mes = int(meses.max())
+    n_meses = ultimo_mes - mes_base + 1
+    activos = np.zeros((n_meses, n_meses), dtype=np.int64)
+    previos = estado["activos"]
+    activos[:previos.shape[0], :previos.shape[1]] = previos
+
+    cliente_mes = np.unique(codigos.astype(np.int64) * n_meses + (meses - mes_base))
+    c = cliente_mes // n_meses
+    fila = cohorte[c] - mes_base
+    columna = cliente_mes % n_meses - fila
+    np.add.at(activos, (fila, columna), 1)
+
+    return {
+        "clientes": clientes,
+        "primera_compra": primera,
+        "ultima_compra": ultima,
+        "frecuencia": frecuencia,
+        "monetario": monetario,
+        "cohorte": cohorte,
+        "activos": activos,
+        "mes_base": int(mes_base),
+        "ultimo_mes": ultimo_mes,
+    }
+
+
+def _puntaje_cuantil(valores: np.ndarray, n_cuantiles: int) -> np.ndarray:
+    """Puntaje 1..n_cuantiles según el percentil de cada valor (empates promediados)."""
+    pct = pd.Series(valores).rank(method="average", pct=True).to_numpy()
+    return np.clip(np.ceil(pct * n_cuantiles), 1, n_cuantiles).astype(np.int64)
+
+
+def calcular_rfm(estado: dict, fecha_referencia=None, n_cuantiles: int = 5) -> pd.DataFrame:
+    """
+    Puntajes RFM por cliente a partir del estado.
+
+    Params:
+        fecha_referencia: fecha contra la que se mide la recencia
+            (por defecto, un día después de la última compra registrada).
+        n_cuantiles: número de niveles de cada puntaje (5 → 1..5).
+
+    Columns:
+        customer_id, recencia_dias, frecuencia, monetario,
+        R, F, M, rfm (ej: "545"), segmento
+    """
+    ultima = estado["ultima_compra"]
+    if len(ultima) == 0:
+        return pd.DataFrame(
+            columns=["customer_id", "recencia_dias", "frecuencia", "monetario", "R", "F", "M", "rfm", "segmento"]
+        )
+
+    if fecha_referencia is None:
+        referencia = ultima.max() + np.timedelta64(1, "D")
+    else:
+        referencia = np.datetime64(pd.Timestamp(fecha_referencia).date(), "D")
+    recencia = (referencia - ultima).astype(np.int64)
+
+    # Menor recencia = mejor puntaje
+    r = n_cuantiles + 1 - _puntaje_cuantil(recencia, n_cuantiles)
+    f = _puntaje_cuantil(estado["frecuencia"], n_cuantiles)
+    m = _puntaje_cuantil(estado["monetario"], n_cuantiles)
+
+    alto = n_cuantiles - 1
+    bajo = 2 * n_cuantiles // 5
+    segmento = np.select(
+        [
+            (r >= alto) & (f >= alto),
+            f >= alto,
+            (r >= alto) & (f <= bajo),
+            (r <= bajo) & (f > bajo),
+            (r <= bajo),
+        ],
+        SEGMENTOS_RFM[:5],
+        default=SEGMENTOS_RFM[5],
+    )
+
+    return pd.DataFrame({
+        "customer_id": estado["clientes"],
+        "recencia_dias": recencia,
+        "frecuencia": estado["frecuencia"],
+        "monetario": estado["monetario"],
+        "R": r,
+        "F": f,
+        "M": m,
+        "rfm": np.char.add(np.char.add(r.astype(str), f.astype(str)), m.astype(str)),
+        "segmento": segmento,
+    })
+
+
+def matriz_cohortes(estado: dict, retencion: bool = True) -> pd.DataFrame:
+    """
+    Matriz de cohortes mensuales: filas = mes de adquisición (YYYY-MM),
+    columnas = meses desde la adquisición (0, 1, 2, ...).
+    Con retencion=True los valores son la proporción de la cohorte activa;
+    si no, el número de clientes activos. Las celdas posteriores al último mes
+    con datos quedan en NaN (aún no observadas, no es abandono).
+    """
+    activos = estado["activos"]
+    if activos.size == 0:
+        return pd.DataFrame()
+
+    indice = (
+        pd.PeriodIndex.from_ordinals(np.arange(activos.shape[0]) + estado["mes_base"], freq="M")
+        .astype(str)
+    )
+    fila, columna = np.indices(activos.shape)
+    observado = fila + columna <= estado["ultimo_mes"] - estado["mes_base"]
+    matriz = pd.DataFrame(
+        np.where(observado, activos, np.nan), index=pd.Index(indice, name="cohorte")
+    )
+    matriz = matriz[matriz[0] > 0]
+
+    if retencion:
+        matriz = matriz.div(matriz[0], axis=0)
+    return matriz
@@ -0,0 +1,168 @@
+import numpy as np
+import pandas as pd
+
+# ==========================================================
+# Conteo aproximado de distintos con HyperLogLog
+# ==========================================================
+#
+# Un sketch es simplemente un arreglo uint8 de 2**precision registros.
+# Fusionar sketches es un máximo elemento a elemento, así que los sketches
+# construidos por chunk, día o tienda se combinan sin volver a leer los IDs.
+# Error estándar relativo ≈ 1.04 / sqrt(2**precision) (p=14 → ~0.8 %).
+
+PRECISION_HLL = 14
+
+COLUMNAS_DISTINTOS = ("invoice_id", "customer_id", "product_id")
+
+
+def hll_nuevo(precision: int = PRECISION_HLL) -> np.ndarray:
+    """Sketch vacío con 2**precision registros."""
+    if not 4 <= precision <= 18:
+        raise ValueError("La precisión de HyperLogLog debe estar entre 4 y 18.")
+    return np.zeros(1 << precision, dtype=np.uint8)
+
+
+def _hash_ids(valores: pd.Series) -> np.ndarray:
+    """
+    Hash de 64 bits estable entre procesos. Los IDs numéricos enteros se
+    normalizan a int64 para que 123 y 123.0 (columna con nulos) coincidan.
+    """
+    valores = valores.dropna()
+    if pd.api.types.is_float_dtype(valores) and (valores % 1 == 0).all():
+        valores = valores.astype(np.int64)
+    return pd.util.hash_array(valores.to_numpy())
+
+
+def _indices_y_rangos(hashes: np.ndarray, precision: int):
+    """Registro destino y posición del primer bit en 1 (rho) de cada hash."""
+    bits_resto = 64 - precision
+    indices = (hashes >> np.uint64(bits_resto)).astype(np.int64)
+    resto = hashes & np.uint64((1 << bits_resto) - 1)
+
+    # rho = ceros a la izquierda del resto + 1 (resto == 0 → bits_resto + 1)
+    largo_bits = np.zeros(len(resto), dtype=np.int64)
+    positivos = resto > 0
+    largo_bits[positivos] = np.floor(np.log2(resto[positivos].astype(np.float64))).astype(np.int64) + 1
+    rangos = (bits_resto - largo_bits + 1).astype(np.uint8)
+    return indices, rangos
+
+
+def hll_agregar(registros: np.ndarray, valores: pd.Series) -> np.ndarray:
+    """Agrega los valores no nulos al sketch (in place) y lo devuelve."""
+    precision = int(np.log2(len(registros)))
+    indices, rangos = _indices_y_rangos(_hash_ids(pd.Series(valores)), precision)
+    np.maximum.at(registros, indices, rangos)
+    return registros
+
+
+def hll_fusionar(*sketches: np.ndarray) -> np.ndarray:
+    """Unión de sketches de la misma precisión."""
+    return np.maximum.reduce(sketches)
+
+
+def hll_estimar(registros: np.ndarray) -> float:
+    """Número estimado de valores distintos del sketch."""
+    m = len(registros)
+    alpha = 0.7213 / (1 + 1.079 / m)
+    estimacion = alpha * m * m / np.sum(np.exp2(-registros.astype(np.float64)))
+
+    # Corrección para cardinalidades pequeñas (linear counting)
+    vacios = int(np.count_nonzero(registros == 0))
+    if estimacion <= 2.5 * m and vacios > 0:
+        estimacion = m * np.log(m / vacios)
+    return float(estimacion)
+
+
+def sketches_distintos(
+    df: pd.DataFrame,
+    columnas=COLUMNAS_DISTINTOS,
+    por=None,
+    precision: int = PRECISION_HLL
+) -> dict:
+    """
+    Construye sketches HyperLogLog para las columnas indicadas.
+
+    Params:
+        df: transacciones (un archivo completo o un chunk).
+        columnas: columnas de IDs a contar.
+        por: None, una columna o lista de columnas para construir un sketch
+            por grupo (ej: "transaction_date", "store_id" o ambas).
+        precision: bits de índice del sketch.
+
+    Returns:
+        - por=None: dict {columna: sketch}
+        - por=...: dict {clave_grupo: {columna: sketch}}
+    """
+    m = 1 << precision
+
+    if por is None:
+        return {col: hll_agregar(hll_nuevo(precision), df[col]) for col in columnas}
+
+    claves = [por] if isinstance(por, str) else list(por)
+    if len(claves) == 1:
+        codigos, grupos = pd.factorize(df[claves[0]])
+    else:
+        codigos, grupos = pd.MultiIndex.from_frame(df[claves]).factorize()
+    n_grupos = len(grupos)
+
+    resultado = {clave: {} for clave in grupos}
+    for col in columnas:
+        validos = df[col].notna().to_numpy() & (codigos >= 0)
+        indices, rangos = _indices_y_rangos(_hash_ids(df[col][validos]), precision)
+
+        # Un solo arreglo (grupos × registros) actualizado en bloque
+        planos = np.zeros(n_grupos * m, dtype=np.uint8)
+        np.maximum.at(planos, codigos[validos] * m + indices, rangos)
+        for clave, registros in zip(grupos, planos.reshape(n_grupos, m)):
+            resultado[clave][col] = registros
+
+    return resultado
+
+
+def fusionar_sketches(*conjuntos: dict) -> dict:
+    """
+    Fusiona dicts {columna: sketch} (por ejemplo varios días o tiendas) en uno.
+    """
+    fusion = {}
+    for conjunto in conjuntos:
+        for col, registros in conjunto.items():
+            fusion[col] = registros.copy() if col not in fusion else np.maximum(fusion[col], registros)
+    return fusion
+
+
+def acumular_sketches(chunks, columnas=COLUMNAS_DISTINTOS, por=None, precision: int = PRECISION_HLL) -> dict:
+    """
+    Consume un iterable de DataFrames (ej: `pd.read_csv(..., chunksize=...)`)
+    y devuelve los sketches fusionados con el mismo formato que
+    `sketches_distintos`, sin mantener los IDs en memoria.
+    """
+    acumulado = {}
+    for chunk in chunks:
+        parcial = sketches_distintos(chunk, columnas, por, precision)
+        if por is None:
+            acumulado = fusionar_sketches(acumulado, parcial)
+        else:
+            for clave, conjunto in parcial.items():
+                acumulado[clave] = fusionar_sketches(acumulado.get(clave, {}), conjunto)
+    return acumulado
+
+
+def contar_distintos(sketches: dict) -> dict:
+    """Estimación redondeada de distintos por columna: {columna: int}."""
+    return {col: int(round(hll_estimar(registros))) for col, registros in sketches.items()}
+
+
+def contar_distintos_rango(sketches_por_dia: dict, desde=None, hasta=None) -> dict:
+    """
+    Distintos aproximados en el rango [desde, hasta] fusionando los sketches
+    diarios (construidos con por="transaction_date").
+    """
+    desde = pd.Timestamp(desde) if desde is not None else None
+    hasta = pd.Timestamp(hasta) if hasta is not None else None
+
+    seleccion = [
+        conjunto for dia, conjunto in sketches_por_dia.items()
+        if (desde is None or pd.Timestamp(dia) >= desde)
+        and (hasta is None or pd.Timestamp(dia) <= hasta)
+    ]
+    return contar_distintos(fusionar_sketches(*seleccion))
@@ -0,0 +1,105 @@
+import numpy as np
+import pandas as pd
+
+from src.ingestion.almacen import iterar_meses, leer_periodo, leer_rollup
+from src.ml.modelo_ventas import entrenar_y_predecir_ventas_diarias, lotes_prediccion
+from src.ml.patrones_horarios import lotes_patrones_horarios
+from .top_k import (
+    CAPACIDAD_TOP_K,
+    ENTIDADES,
+    METRICAS,
+    UMBRAL_EXACTO,
+    resumen_top_k,
+    top_k_resultado,
+    top_k_streaming,
+)
+
+# ==========================================================
+# Tablas exportables de un dataset del almacén, por lotes
+# ==========================================================
+#
+# Cada tabla se produce como un generador de DataFrames con el mismo esquema.
+# Las transacciones se leen una partición mensual a la vez, así que la memoria
+# no crece con el tamaño del periodo exportado.
+
+TABLAS_EXPORTACION = {
+    "ventas_diarias": "Rollup diario: ventas, ítems, líneas y facturas por día",
+    "top_productos": "Top N productos por ingreso, cantidad y facturas",
+    "top_clientes": "Top N clientes por ingreso, cantidad y facturas",
+    "patrones": "Patrones por día y franja horaria, un bloque por mes",
+    "pronostico": "Histórico diario, ajuste y predicción de los próximos días",
+}
+
+_COLUMNAS_PATRONES = ["transaction_date", "transaction_time", "invoice_id", "product_subtotal"]
+
+
+def _lotes_rollup_diario(raiz: str, periodo: str | None):
+    diario = leer_rollup(raiz, "diario", periodo)
+    for _, lote in diario.groupby(diario["transaction_date"].dt.to_period("M"), sort=True):
+        yield lote.reset_index(drop=True)
+
+
+def _lotes_top(raiz: str, periodo: str | None, entidad: str, n: int):
+    clave, atributos = ENTIDADES[entidad]
+    columnas = [clave, *atributos, "invoice_id", "product_quantity", "product_subtotal"]
+
+    # Hasta UMBRAL_EXACTO filas (según el rollup) el periodo se agrega completo
+    # y el top es exacto; por encima, resumen fusionable mes a mes.
+    filas = int(leer_rollup(raiz, "diario", periodo)["n_lineas"].sum())
+    if filas <= UMBRAL_EXACTO:
+        df = leer_periodo(raiz, periodo, columnas)
+        resumenes = {
+            metrica: resumen_top_k(df, entidad, metrica, capacidad=np.iinfo(np.int64).max)
+            for metrica in METRICAS
+        }
+    else:
+        resumenes = top_k_streaming(
+            iterar_meses(raiz, periodo, columnas),
+            entidad=entidad,
+            capacidad=max(CAPACIDAD_TOP_K, 4 * n)
+        )
+    for metrica, resumen in resumenes.items():
+        tabla = top_k_resultado(resumen, n)
+        tabla.insert(0, "metrica", metrica)
+        tabla.insert(1, "posicion", range(1, len(tabla) + 1))
+        yield tabla
+
+
+def _lotes_pronostico(raiz: str, periodo: str | None, dias_futuro: int):
+    # El modelo trabaja sobre ventas diarias: el rollup basta como entrada
+    diario = leer_rollup(raiz, "diario", periodo)
+    entrada = pd.DataFrame({
+        "transaction_date": diario["transaction_date"],
+        "product_subtotal": diario["total_ventas"],
+    })
+    yield from lotes_prediccion(entrenar_y_predecir_ventas_diarias(entrada, dias_futuro))
+
+
+def lotes_exportacion(
+    raiz: str,
+    tabla: str,
+    periodo: str | None = None,
+    n: int = 100,
+    dias_futuro: int = 7
+):
+    """
+    Generador de DataFrames (mismo esquema) de la tabla pedida.
+
+    Params:
+        raiz: directorio del dataset en el almacén.
+        tabla: una de TABLAS_EXPORTACION.
+        periodo: filtro de periodo opcional (mismas reglas que `filtrar_por_periodo`).
+        n: filas por métrica en las tablas top.
+        dias_futuro: días a predecir en "pronostico".
+    """
+    if tabla == "ventas_diarias":
+        return _lotes_rollup_diario(raiz, periodo)
+    if tabla == "top_productos":
+        return _lotes_top(raiz, periodo, "producto", n)
+    if tabla == "top_clientes":
+        return _lotes_top(raiz, periodo, "cliente", n)
+    if tabla == "patrones":
+        return lotes_patrones_horarios(iterar_meses(raiz, periodo, _COLUMNAS_PATRONES))
+    if tabla == "pronostico":
+        return _lotes_pronostico(raiz, periodo, dias_futuro)
+    raise ValueError(f"Tabla no reconocida: {tabla}")
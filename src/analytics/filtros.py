@@ -2,21 +2,37 @@ import pandas as pd
 from datetime import timedelta
 from .periodos import obtener_mes_por_defecto
 
-def filtrar_por_periodo(df: pd.DataFrame, periodo: str):
-    df["transaction_date"] = pd.to_datetime(df["transaction_date"])
+def rango_periodo(fechas: pd.Series, periodo: str) -> tuple:
+    """
+    Devuelve (inicio, fin), ambos inclusivos, del periodo solicitado.
+    `fechas` puede ser la columna transaction_date completa o solo los días
+    distintos (por ejemplo un rollup diario): el resultado es el mismo.
+    """
+    fechas = pd.to_datetime(fechas)
 
     # Caso 1: último mes completo
     if periodo == "ultimo_mes":
-        mes = obtener_mes_por_defecto(df)
+        mes = obtener_mes_por_defecto(fechas.to_frame("transaction_date"))
         if mes is None:
             raise ValueError("No hay meses con suficientes datos para análisis.")
-        return df[df["transaction_date"].dt.to_period("M") == mes]
+        mes = pd.Period(mes, freq="M")
+        return mes.start_time, mes.end_time
 
     # Caso 2: últimos 90 días
     if periodo == "ultimos_90_dias":
-        max_fecha = df["transaction_date"].max()
-        min_permitida = max_fecha - timedelta(days=90)
-        return df[df["transaction_date"] >= min_permitida]
+        max_fecha = fechas.max()
+        return max_fecha - timedelta(days=90), max_fecha
 
     # Caso 3: mes explícito (ej: "2025-11")
-    return df[df["transaction_date"].dt.to_period("M") == periodo]
\ No newline at end of file
+    try:
+        mes = pd.Period(periodo, freq="M")
+    except ValueError:
+        raise ValueError(f"Periodo no reconocido: {periodo}")
+    return mes.start_time, mes.end_time
+
+
+def filtrar_por_periodo(df: pd.DataFrame, periodo: str):
+    df["transaction_date"] = pd.to_datetime(df["transaction_date"])
+
+    inicio, fin = rango_periodo(df["transaction_date"], periodo)
+    return df[df["transaction_date"].between(inicio, fin)]
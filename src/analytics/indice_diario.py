@@ -0,0 +1,191 @@
+import numpy as np
+import pandas as pd
+
+# ==========================================================
+# Índice diario con sumas acumuladas
+# ==========================================================
+#
+# Se construye una vez por dataset: un arreglo denso por día calendario entre
+# la primera y la última fecha, con la suma acumulada de ventas, ítems y
+# facturas (acumulado[0] = 0). El total de cualquier rango [desde, hasta] es
+# acumulado[fin + 1] - acumulado[inicio]: dos lecturas, sin volver a agrupar
+# las transacciones.
+
+METRICAS_INDICE = {
+    "ventas": "total_ventas",
+    "items": "cantidad_total",
+    "facturas": "n_facturas",
+}
+
+
+def construir_indice_diario(df: pd.DataFrame, por_categoria: bool = False) -> dict:
+    """
+    Construye el índice a partir de transacciones validadas.
+
+    Params:
+        por_categoria: si es True guarda además las ventas acumuladas por
+            product_category (matriz días × categorías).
+
+    Returns:
+        dict con fecha_min, n_dias, acumulados {metrica: arreglo (n_dias + 1)}
+        y, opcionalmente, categorias y acumulado_categorias.
+    """
+    fechas = pd.to_datetime(df["transaction_date"]).dt.normalize()
+    if fechas.empty:
+        raise ValueError("No hay transacciones para construir el índice diario.")
+
+    fecha_min = fechas.min()
+    n_dias = (fechas.max() - fecha_min).days + 1
+    posicion = (fechas - fecha_min).dt.days.to_numpy()
+
+    subtotal = pd.to_numeric(df["product_subtotal"], errors="coerce").fillna(0).to_numpy()
+    cantidad = pd.to_numeric(df["product_quantity"], errors="coerce").fillna(0).to_numpy()
+
+    # Facturas distintas por día (una factura pertenece a un solo día)
+    pares = pd.DataFrame({"dia": posicion, "factura": df["invoice_id"].to_numpy()}).drop_duplicates()
+
+    diarios = {
+        "ventas": np.bincount(posicion, weights=subtotal, minlength=n_dias),
+        "items": np.bincount(posicion, weights=cantidad, minlength=n_dias),
+        "facturas": np.bincount(pares["dia"].to_numpy(), minlength=n_dias).astype(np.float64),
+    }
+
+    indice = {
+        "fecha_min": fecha_min,
+        "n_dias": n_dias,
+        "acumulados": {m: np.concatenate([[0.0], np.cumsum(v)]) for m, v in diarios.items()},
+    }
+
+    if por_categoria:
+        codigos, categorias = pd.factorize(df["product_category"])
+        validos = codigos >= 0
+        matriz = np.zeros((n_dias, len(categorias)))
+        np.add.at(matriz, (posicion[validos], codigos[validos]), subtotal[validos])
+        indice["categorias"] = pd.Index(categorias)
+        indice["acumulado_categorias"] = np.vstack([np.zeros(len(categorias)), np.cumsum(matriz, axis=0)])
+
+    return indice
+
+
+def _posiciones(indice: dict, desde, hasta) -> tuple:
+    """Posiciones [inicio, fin) en el acumulado, recortadas al rango del índice."""
+    inicio = (pd.Timestamp(desde).normalize() - indice["fecha_min"]).days
+    fin = (pd.Timestamp(hasta).normalize() - indice["fecha_min"]).days + 1
+    return int(np.clip(inicio, 0, indice["n_dias"])), int(np.clip(fin, 0, indice["n_dias"]))
+
+
+def total_rango(indice: dict, desde, hasta, metrica: str = "ventas", categoria=None) -> float:
+    """Total de la métrica entre `desde` y `hasta` (inclusivos) en O(1)."""
+    inicio, fin = _posiciones(indice, desde, hasta)
+    if fin <= inicio:
+        return 0.0
+    if categoria is not None:
+        columna = indice["categorias"].get_loc(categoria)
+        acumulado = indice["acumulado_categorias"][:, columna]
+    else:
+        acumulado = indice["acumulados"][metrica]
+    return float(acumulado[fin] - acumulado[inicio])
+
+
+def serie_diaria(indice: dict, desde=None, hasta=None, metrica: str = "ventas") -> pd.DataFrame:
+    """
+    Serie diaria densa (días sin ventas = 0) del rango, con el mismo formato
+    que `ventas_diarias` para la métrica de ventas.
+
+    Columns:
+        transaction_date, total_ventas | cantidad_total | n_facturas
+    """
+    desde = indice["fecha_min"] if desde is None else desde
+    hasta = indice["fecha_min"] + pd.Timedelta(days=indice["n_dias"] - 1) if hasta is None else hasta
+    inicio, fin = _posiciones(indice, desde, hasta)
+
+    valores = np.diff(indice["acumulados"][metrica][inicio:fin + 1])
+    return pd.DataFrame({
+        "transaction_date": indice["fecha_min"] + pd.to_timedelta(np.arange(inicio, fin), unit="D"),
+        METRICAS_INDICE[metrica]: valores,
+    })
+
+
+def media_movil(indice: dict, ventana: int = 7, metrica: str = "ventas") -> pd.DataFrame:
+    """
+    Media móvil de `ventana` días para todo el índice (una resta por día).
+    Los primeros `ventana - 1` días no tienen valor.
+    """
+    acumulado = indice["acumulados"][metrica]
+    medias = np.full(indice["n_dias"], np.nan)
+    if indice["n_dias"] >= ventana:
+        medias[ventana - 1:] = (acumulado[ventana:] - acumulado[:-ventana]) / ventana
+    return pd.DataFrame({
+        "transaction_date": indice["fecha_min"] + pd.to_timedelta(np.arange(indice["n_dias"]), unit="D"),
+        f"media_movil_{ventana}d": medias,
+    })
+
+
+def _cobertura(indice: dict, desde, hasta) -> float:
+    """Proporción de días del rango que caen dentro del índice."""
+    dias = (pd.Timestamp(hasta).normalize() - pd.Timestamp(desde).normalize()).days + 1
+    inicio, fin = _posiciones(indice, desde, hasta)
+    return max(fin - inicio, 0) / dias if dias > 0 else 0.0
+
+
+def comparar_periodos(indice: dict, desde, hasta, referencia: str = "anterior") -> dict:
+    """
+    Compara el periodo [desde, hasta] contra un periodo de referencia.
+    Las facturas se comparan como suma de facturas distintas por día.
+
+    Params:
+        referencia: "anterior" (si [desde, hasta] es un mes calendario, el mes
+            anterior; si no, el mismo número de días inmediatamente antes) o
+            "anio_anterior" (mismas fechas un año antes).
+
+    Returns:
+        dict con los rangos, cobertura de la referencia (proporción de días con
+        datos) y, por métrica, actual, referencia, diferencia y variacion_pct.
+    """
+    desde, hasta = pd.Timestamp(desde).normalize(), pd.Timestamp(hasta).normalize()
+    mes_calendario = (
+        desde.day == 1 and hasta.is_month_end and desde.to_period("M") == hasta.to_period("M")
+    )
+
+    # El periodo actual se recorta a los días con datos para no comparar un
+    # mes parcial contra uno completo.
+    fecha_max = indice["fecha_min"] + pd.Timedelta(days=indice["n_dias"] - 1)
+    desde = max(desde, indice["fecha_min"])
+    hasta = min(hasta, fecha_max)
+
+    if referencia == "anterior" and mes_calendario:
+        # Mes contra mes: mismos días del mes anterior (mes completo si el
+        # actual está completo, aunque tengan distinto número de días)
+        ref_desde = desde - pd.DateOffset(months=1)
+        ref_hasta = hasta - (pd.offsets.MonthEnd(1) if hasta.is_month_end else pd.DateOffset(months=1))
+    elif referencia == "anterior":
+        dias = (hasta - desde).days + 1
+        ref_hasta = desde - pd.Timedelta(days=1)
+        ref_desde = ref_hasta - pd.Timedelta(days=dias - 1)
+    elif referencia == "anio_anterior":
+        ref_desde = desde - pd.DateOffset(years=1)
+        ref_hasta = hasta - pd.DateOffset(years=1)
+    else:
+        raise ValueError(f"Referencia no reconocida: {referencia}")
+
+    metricas = {}
+    for metrica in METRICAS_INDICE:
+        actual = total_rango(indice, desde, hasta, metrica)
+        previo = total_rango(indice, ref_desde, ref_hasta, metrica)
+        metricas[metrica] = {
+            "actual": actual,
+            "referencia": previo,
+            "diferencia": actual - previo,
+            "variacion_pct": (actual - previo) / previo * 100 if previo else None,
+        }
+
+    return {
+        "periodo": {"desde": desde.date().isoformat(), "hasta": hasta.date().isoformat()},
+        "referencia": {
+            "tipo": referencia,
+            "desde": ref_desde.date().isoformat(),
+            "hasta": ref_hasta.date().isoformat(),
+            "cobertura": _cobertura(indice, ref_desde, ref_hasta),
+        },
+        "metricas": metricas,
+    }
@@ -0,0 +1,232 @@
+import numpy as np
+import pandas as pd
+
+from src.ingestion.validator import cargar_csv
+from src.ml.patrones_horarios import DIAS, bucket_hora
+from .distintos import PRECISION_HLL, fusionar_sketches, hll_estimar, sketches_distintos
+
+# ==========================================================
+# Muestra estratificada por día y hora para vista previa
+# ==========================================================
+#
+# Una sola pasada por chunks del CSV (sin armar el DataFrame completo):
+#   - cuenta exacta de filas por estrato (fecha + hora del día; -1 si falta),
+#   - hasta `filas_por_estrato` filas por estrato, elegidas con prioridades
+#     aleatorias (equivale a un muestreo aleatorio simple dentro del estrato),
+#   - sketches HyperLogLog de facturas, clientes y productos.
+# Cada fila de la muestra pesa N_h / n_h. Los totales se estiman por estrato
+# con su error estándar; los distintos salen de los sketches.
+
+FILAS_POR_ESTRATO = 30
+
+# z para intervalos del 95 %
+Z_95 = 1.96
+
+
+def _estrato(chunk: pd.DataFrame) -> np.ndarray:
+    """
+    Estrato entero = días desde 1970 × 24 + hora. Fechas y horas se convierten
+    solo sobre sus valores únicos (pocos por chunk), no fila por fila.
+    """
+    codigos_fecha, fechas = pd.factorize(chunk["transaction_date"])
+    dias = (pd.to_datetime(fechas, errors="coerce") - pd.Timestamp(0)).days.to_numpy(dtype=np.float64)
+
+    codigos_hora, horas = pd.factorize(chunk["transaction_time"])
+    # "HH:MM:SS" o "H:MM:SS" → hora
+    horas = pd.to_numeric(
+        pd.Series(horas).astype(str).str.slice(0, 2).str.rstrip(":"), errors="coerce"
+    ).to_numpy(dtype=np.float64)
+
+    # Fecha u hora faltante (código -1 o no parseable) → estrato -1
+    estrato = np.full(len(chunk), -1, dtype=np.int64)
+    validos = (codigos_fecha >= 0) & (codigos_hora >= 0)
+    dia, hora = dias[codigos_fecha[validos]], horas[codigos_hora[validos]]
+    ok = ~(np.isnan(dia) | np.isnan(hora))
+    estrato[np.flatnonzero(validos)[ok]] = dia[ok].astype(np.int64) * 24 + hora[ok].astype(np.int64)
+    return estrato
+
+
+def _menores_por_estrato(df: pd.DataFrame, limite: int) -> np.ndarray:
+    """Posiciones de las `limite` filas de menor prioridad de cada estrato."""
+    estrato = df["estrato"].to_numpy()
+    # prioridad ∈ [0, 1): ordenar estrato + prioridad ordena por ambos
+    orden = np.argsort(estrato + df["_prioridad"].to_numpy(), kind="stable")
+    ordenado = estrato[orden]
+    inicio_grupo = np.r_[True, ordenado[1:] != ordenado[:-1]]
+    posicion = np.arange(len(orden))
+    rango = posicion - np.maximum.accumulate(np.where(inicio_grupo, posicion, 0))
+    return np.sort(orden[rango < limite])
+
+
+def muestra_estratificada(
+    archivo,
+    filas_por_estrato: int = FILAS_POR_ESTRATO,
+    chunksize: int = 200_000,
+    semilla: int = 42,
+    precision: int = PRECISION_HLL
+) -> dict:
+    """
+    Lee el CSV por chunks y devuelve la muestra estratificada.
+
+    Params:
+        archivo: ruta o buffer (ej: el archivo subido en Streamlit).
+
+    Returns:
+        dict con:
+            muestra: DataFrame validado (cargar_csv) + columnas estrato y peso
+            conteos: Series {estrato: filas en el archivo}
+            sketches: {columna: sketch HLL} del archivo completo
+            n_filas: filas del archivo
+            precision: precisión de los sketches
+    """
+    rng = np.random.default_rng(semilla)
+    retenidas = None
+    conteos = pd.Series(dtype=np.int64)
+    sketches = {}
+
+    for chunk in pd.read_csv(archivo, chunksize=chunksize):
+        chunk = chunk.assign(estrato=_estrato(chunk), _prioridad=rng.random(len(chunk)))
+        conteos = conteos.add(chunk["estrato"].value_counts(), fill_value=0)
+        sketches = fusionar_sketches(sketches, sketches_distintos(chunk, precision=precision))
+
+        # Primero se recorta el chunk (solo se copian las filas candidatas) y
+        # luego se fusiona con lo retenido hasta ahora.
+        chunk = chunk.iloc[_menores_por_estrato(chunk, filas_por_estrato)]
+        candidatas = chunk if retenidas is None else pd.concat([retenidas, chunk], ignore_index=True)
+        retenidas = candidatas.iloc[_menores_por_estrato(candidatas, filas_por_estrato)].reset_index(drop=True)
+
+    if retenidas is None:
+        raise ValueError("El archivo no contiene transacciones.")
+
+    muestra = cargar_csv(retenidas.drop(columns=["_prioridad"]).reset_index(drop=True))
+    conteos = conteos.astype(np.int64)
+    muestra["peso"] = muestra["estrato"].map(conteos / muestra["estrato"].value_counts())
+
+    return {
+        "muestra": muestra,
+        "conteos": conteos,
+        "sketches": sketches,
+        "n_filas": int(conteos.sum()),
+        "precision": precision,
+    }
+
+
+def _totales_por_estrato(muestra: pd.DataFrame, conteos: pd.Series, columna: str) -> pd.DataFrame:
+    """Total estimado y su varianza por estrato (muestreo sin reemplazo)."""
+    valores = pd.to_numeric(muestra[columna], errors="coerce").fillna(0)
+    por_estrato = valores.groupby(muestra["estrato"]).agg(["size", "mean", "var"])
+    N = conteos.reindex(por_estrato.index).astype(np.float64)
+    n = por_estrato["size"].astype(np.float64)
+
+    return pd.DataFrame({
+        "total": N * por_estrato["mean"],
+        "varianza": (N ** 2 * (1 - n / N) * por_estrato["var"].fillna(0) / n),
+    })
+
+
+def _estimar_por_grupo(resultado: dict, columna: str, grupo) -> pd.DataFrame:
+    """
+    Suma los totales por estrato según `grupo` (función estratos → claves).
+    Los estratos sin fecha u hora (-1) no entran en los desgloses.
+    """
+    totales = _totales_por_estrato(resultado["muestra"], resultado["conteos"], columna)
+    totales = totales[totales.index >= 0]
+    agrupado = totales.groupby(grupo(totales.index.to_numpy())).sum()
+    agrupado["margen"] = Z_95 * np.sqrt(agrupado["varianza"])
+    return agrupado.drop(columns=["varianza"])
+
+
+def _fechas_estrato(estratos: np.ndarray) -> pd.DatetimeIndex:
+    return pd.Timestamp(0) + pd.to_timedelta(estratos // 24, unit="D")
+
+
+def _margen_hll(estimacion: float, precision: int) -> float:
+    """Margen del 95 % de HyperLogLog (error estándar relativo 1.04 / sqrt(m))."""
+    return Z_95 * 1.04 / np.sqrt(1 << precision) * estimacion
+
+
+def estimar_kpis(resultado: dict) -> dict:
+    """
+    KPIs estimados con su margen del 95 %.
+
+    Returns:
+        dict {total_ventas, num_facturas_unicas, num_productos,
+              num_clientes_unicos: {"valor", "margen"}, num_transacciones: int}
+    """
+    totales = _totales_por_estrato(resultado["muestra"], resultado["conteos"], "product_subtotal")
+    kpis = {
+        "total_ventas": {
+            "valor": float(totales["total"].sum()),
+            "margen": float(Z_95 * np.sqrt(totales["varianza"].sum())),
+        },
+        "num_transacciones": resultado["n_filas"],
+    }
+    for clave, columna in [
+        ("num_facturas_unicas", "invoice_id"),
+        ("num_productos", "product_id"),
+        ("num_clientes_unicos", "customer_id"),
+    ]:
+        estimacion = hll_estimar(resultado["sketches"][columna])
+        kpis[clave] = {
+            "valor": int(round(estimacion)),
+            "margen": float(_margen_hll(estimacion, resultado["precision"])),
+        }
+    return kpis
+
+
+def estimar_ventas_diarias(resultado: dict) -> pd.DataFrame:
+    """
+    Ventas diarias estimadas.
+
+    Columns:
+        transaction_date, total_ventas, margen (95 %)
+    """
+    diario = _estimar_por_grupo(
+        resultado, "product_subtotal",
+        lambda estratos: _fechas_estrato(estratos).rename("transaction_date")
+    )
+    return diario.rename(columns={"total": "total_ventas"}).reset_index()
+
+
+def estimar_patrones_horarios(resultado: dict) -> pd.DataFrame:
+    """
+    Ventas estimadas por día de la semana y franja horaria (mismas celdas que
+    `detectar_patrones_horarios`).
+
+    Columns:
+        Día, Franja horaria, Ventas totales, margen (95 %)
+    """
+    def _celda(estratos):
+        return [_fechas_estrato(estratos).dayofweek, [bucket_hora(h) for h in estratos % 24]]
+
+    patrones = _estimar_por_grupo(resultado, "product_subtotal", _celda)
+    patrones.index.names = ["dia_idx", "Franja horaria"]
+    patrones = patrones.reset_index().sort_values(["dia_idx", "Franja horaria"])
+    patrones.insert(0, "Día", patrones["dia_idx"].map(DIAS))
+    return (
+        patrones.drop(columns=["dia_idx"])
+                .rename(columns={"total": "Ventas totales"})
+                .reset_index(drop=True)
+    )
+
+
+def estimar_top_productos(resultado: dict, n: int = 5) -> pd.DataFrame:
+    """
+    Top N productos por ingreso estimado (suma ponderada de la muestra).
+
+    Columns:
+        product_id, product_name, product_category, cantidad_total, ingreso_total
+    """
+    muestra = resultado["muestra"]
+    ponderado = muestra.assign(
+        cantidad_total=muestra["product_quantity"].fillna(0) * muestra["peso"],
+        ingreso_total=muestra["product_subtotal"].fillna(0) * muestra["peso"],
+    )
+    return (
+        ponderado.groupby(["product_id", "product_name", "product_category"], dropna=False)
+                 [["cantidad_total", "ingreso_total"]].sum()
+                 .reset_index()
+                 .sort_values("ingreso_total", ascending=False)
+                 .head(n)
+                 .reset_index(drop=True)
+    )
@@ -1,5 +1,7 @@
 import pandas as pd
 
+from .top_k import CAPACIDAD_TOP_K, UMBRAL_EXACTO, claves_candidatas
+
 def ventas_por_categoria(df: pd.DataFrame) -> pd.DataFrame:
     """
     Ventas totales por categoría de producto.
@@ -15,7 +17,13 @@ def ventas_por_categoria(df: pd.DataFrame) -> pd.DataFrame:
 def top_productos_por_ventas(df: pd.DataFrame, top_n: int = 10) -> pd.DataFrame:
     """
     Top N productos por ventas totales.
+    Con más de UMBRAL_EXACTO filas solo se agregan los candidatos del
+    resumen top-K.
     """
+    if len(df) > UMBRAL_EXACTO:
+        candidatos = claves_candidatas(df, "producto", ["ingreso"], capacidad=max(CAPACIDAD_TOP_K, top_n))
+        df = df[df["product_id"].isin(candidatos)]
+
     agg = (
         df.groupby(["product_id", "product_name"], as_index=False)
           .agg(total_ventas=("product_subtotal", "sum"))
@@ -0,0 +1,199 @@
+import numpy as np
+import pandas as pd
+
+# ==========================================================
+# Top-K en streaming (Misra-Gries fusionable)
+# ==========================================================
+#
+# Un resumen es un dict con:
+#   - tabla: DataFrame indexado por la clave (product_id / customer_id) con
+#       valor: contador Misra-Gries (cota inferior de la métrica)
+#       + columnas descriptivas (nombre, categoría)
+#   - cota: total descontado al truncar. El valor real de una clave retenida
+#       está en [valor, valor + cota]; el de una no retenida es ≤ cota
+#   - capacidad: número máximo de claves retenidas
+#
+# Cada chunk se agrega de forma exacta (memoria acotada por el chunk) y se
+# fusiona con el resumen acumulado sumando contadores; al superar la
+# capacidad se resta a todas las claves el contador de la (capacidad + 1)-ésima
+# (Agarwal et al., "Mergeable Summaries"). Los resúmenes de tiendas o procesos
+# distintos se fusionan igual. Supone métricas no negativas.
+
+CAPACIDAD_TOP_K = 256
+
+# Por debajo de este número de filas se usa la agregación exacta
+UMBRAL_EXACTO = 500_000
+
+ENTIDADES = {
+    "producto": ("product_id", ["product_name", "product_category"]),
+    "cliente": ("customer_id", ["customer_name"]),
+}
+
+METRICAS = {
+    "ingreso": ("product_subtotal", "sum"),
+    "cantidad": ("product_quantity", "sum"),
+    "facturas": ("invoice_id", "nunique"),
+}
+
+
+def _truncar(tabla: pd.DataFrame, cota: float, capacidad: int) -> dict:
+    """
+    Reduce la tabla a `capacidad` claves: resta a todas el contador de la
+    (capacidad + 1)-ésima, descarta las que quedan en cero y suma lo restado
+    a la cota.
+    """
+    if len(tabla) > capacidad:
+        tabla = tabla.sort_values("valor", ascending=False)
+        descuento = float(tabla["valor"].iloc[capacidad])
+        tabla = tabla.iloc[:capacidad].copy()
+        tabla["valor"] -= descuento
+        tabla = tabla[tabla["valor"] > 0]
+        cota += descuento
+    return {"tabla": tabla, "cota": float(cota), "capacidad": capacidad}
+
+
+def resumen_top_k(
+    df: pd.DataFrame,
+    entidad: str = "producto",
+    metrica: str = "ingreso",
+    capacidad: int = CAPACIDAD_TOP_K,
+    atributos: bool = True
+) -> dict:
+    """
+    Resumen top-K de un chunk de transacciones (agregación exacta del chunk
+    truncada a `capacidad` claves). Con atributos=False la tabla solo lleva
+    `valor`.
+    """
+    clave, columnas_atributos = ENTIDADES[entidad]
+    columna, funcion = METRICAS[metrica]
+
+    df = df[df[clave].notna()]
+    if funcion == "sum":
+        valores = pd.to_numeric(df[columna], errors="coerce").fillna(0)
+    else:
+        valores = df[columna]
+
+    agrupado = valores.groupby(df[clave]).agg(funcion).astype(float).rename("valor")
+    if atributos:
+        tabla = pd.concat(
+            [agrupado, df.groupby(clave)[columnas_atributos].first()], axis=1
+        )
+    else:
+        tabla = agrupado.to_frame()
+
+    return _truncar(tabla, 0.0, capacidad)
+
+
+def fusionar_resumenes_top_k(a: dict, b: dict) -> dict:
+    """
+    Fusiona dos resúmenes: suma contadores (clave ausente = 0) y cotas, y
+    trunca. `valor` sigue siendo cota inferior y `valor + cota` superior.
+    """
+    ta, tb = a["tabla"], b["tabla"]
+    indice = ta.index.union(tb.index)
+    ta_al = ta.reindex(indice)
+    tb_al = tb.reindex(indice)
+
+    tabla = ta_al.combine_first(tb_al)
+    tabla["valor"] = ta_al["valor"].fillna(0.0) + tb_al["valor"].fillna(0.0)
+
+    capacidad = min(a["capacidad"], b["capacidad"])
+    return _truncar(tabla, a["cota"] + b["cota"], capacidad)
+
+
+def top_k_streaming(
+    chunks,
+    entidad: str = "producto",
+    metricas=tuple(METRICAS),
+    capacidad: int = CAPACIDAD_TOP_K,
+    atributos: bool = True
+) -> dict:
+    """
+    Consume un iterable de DataFrames (ej: `pd.read_csv(..., chunksize=...)`)
+    manteniendo un resumen por métrica con memoria acotada.
+
+    Nota: "facturas" cuenta facturas distintas por chunk; si una factura se
+    reparte entre chunks se cuenta más de una vez.
+
+    Returns:
+        dict {metrica: resumen}
+    """
+    resumenes = {}
+    for chunk in chunks:
+        for metrica in metricas:
+            parcial = resumen_top_k(chunk, entidad, metrica, capacidad, atributos)
+            resumenes[metrica] = (
+                parcial if metrica not in resumenes
+                else fusionar_resumenes_top_k(resumenes[metrica], parcial)
+            )
+    return resumenes
+
+
+def claves_candidatas(
+    df: pd.DataFrame,
+    entidad: str = "producto",
+    metricas=("ingreso",),
+    capacidad: int = CAPACIDAD_TOP_K,
+    chunksize: int = 100_000
+) -> pd.Index:
+    """
+    Claves retenidas por los resúmenes de `metricas` recorriendo `df` por
+    chunks. Toda clave cuya métrica supere la cota del resumen queda retenida,
+    así que el top N (N ≤ capacidad) real está entre las candidatas salvo en
+    distribuciones casi planas. Permite recalcular de forma exacta solo estas
+    claves en lugar de agrupar todas.
+    """
+    chunks = (df.iloc[i:i + chunksize] for i in range(0, len(df), chunksize))
+    resumenes = top_k_streaming(chunks, entidad, metricas, capacidad, atributos=False)
+
+    candidatas = pd.Index([])
+    for resumen in resumenes.values():
+        candidatas = candidatas.union(resumen["tabla"].index)
+    return candidatas
+
+
+def top_k_resultado(resumen: dict, n: int = 10) -> pd.DataFrame:
+    """
+    Top N del resumen con cotas de error.
+
+    Columns:
+        clave, atributos, valor (cota superior), error, valor_min (cota
+        inferior, criterio de orden), garantizado (True si la clave está en
+        el top N real con certeza)
+    """
+    cota = resumen["cota"]
+    tabla = resumen["tabla"].sort_values("valor", ascending=False)
+    top = tabla.head(n).copy()
+    top["valor_min"] = top["valor"]
+    top["valor"] += cota
+    top.insert(1, "error", cota)
+
+    # Una clave es top N seguro si su cota inferior supera la cota superior
+    # de cualquier clave fuera del top (siguiente en la tabla o no retenida).
+    siguiente = tabla["valor"].iloc[n] if len(tabla) > n else 0.0
+    top["garantizado"] = top["valor_min"] >= siguiente + cota
+
+    return top.reset_index()
+
+
+def top_k(
+    fuente,
+    entidad: str = "producto",
+    metrica: str = "ingreso",
+    n: int = 10,
+    capacidad: int = CAPACIDAD_TOP_K,
+    chunksize: int = 100_000
+) -> pd.DataFrame:
+    """
+    Top N por métrica para un DataFrame o un iterable de chunks.
+    DataFrames con ≤ UMBRAL_EXACTO filas usan la agregación exacta (error 0);
+    el resto se procesa por chunks con el resumen fusionable.
+    """
+    if isinstance(fuente, pd.DataFrame):
+        if len(fuente) <= UMBRAL_EXACTO:
+            resumen = resumen_top_k(fuente, entidad, metrica, capacidad=np.iinfo(np.int64).max)
+            return top_k_resultado(resumen, n)
+        fuente = (fuente.iloc[i:i + chunksize] for i in range(0, len(fuente), chunksize))
+
+    resumen = top_k_streaming(fuente, entidad, [metrica], capacidad)[metrica]
+    return top_k_resultado(resumen, n)
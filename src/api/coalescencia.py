@@ -0,0 +1,75 @@
+import asyncio
+import hashlib
+
+from starlette.concurrency import run_in_threadpool
+
+from src.api.perfilado import perfil_solicitado, perfilar
+
+# ==========================================================
+# Coalescencia de peticiones idénticas concurrentes
+# ==========================================================
+#
+# Si llega una petición con la misma clave (endpoint + hash del archivo +
+# parámetros) mientras otra idéntica se está calculando, espera ese cálculo y
+# comparte su resultado en lugar de parsear el CSV y entrenar de nuevo.
+# El cálculo corre en el threadpool como tarea independiente: si el cliente
+# que lo inició se desconecta, los demás siguen esperando el mismo resultado.
+# Alcance: un proceso (cada worker de uvicorn coalesce sus propias peticiones).
+# Las peticiones perfiladas (src/api/perfilado.py) no se coalescen: calculan
+# siempre por su cuenta para que el perfil refleje el trabajo completo.
+
+_en_vuelo = {}
+_metricas = {}
+
+
+def clave_peticion(endpoint: str, contents: bytes, **parametros) -> str:
+    """Clave estable para la petición: endpoint, contenido y parámetros."""
+    h = hashlib.blake2b(contents, digest_size=16)
+    for nombre in sorted(parametros):
+        h.update(f"|{nombre}={parametros[nombre]!r}".encode("utf-8"))
+    return f"{endpoint}:{h.hexdigest()}"
+
+
+def _contar(endpoint: str, campo: str) -> None:
+    metricas = _metricas.setdefault(endpoint, {"ejecutadas": 0, "coalescidas": 0, "perfiladas": 0})
+    metricas[campo] += 1
+
+
+async def una_sola_vez(clave: str, funcion, *args, **kwargs):
+    """
+    Ejecuta `funcion(*args, **kwargs)` en el threadpool salvo que ya haya un
+    cálculo en curso con la misma clave, en cuyo caso espera su resultado.
+    """
+    endpoint = clave.split(":", 1)[0]
+
+    solicitud = perfil_solicitado()
+    if solicitud is not None:
+        _contar(endpoint, "perfiladas")
+        return await run_in_threadpool(perfilar, solicitud, endpoint, funcion, *args, **kwargs)
+
+    tarea = _en_vuelo.get(clave)
+
+    if tarea is None:
+        tarea = asyncio.ensure_future(run_in_threadpool(funcion, *args, **kwargs))
+        _en_vuelo[clave] = tarea
+        tarea.add_done_callback(lambda _: _en_vuelo.pop(clave, None))
+        _contar(endpoint, "ejecutadas")
+    else:
+        _contar(endpoint, "coalescidas")
+
+    # shield: cancelar una petición no cancela el cálculo compartido
+    return await asyncio.shield(tarea)
+
+
+def metricas_coalescencia() -> dict:
+    """En vuelo por endpoint y contadores acumulados de ejecutadas/coalescidas."""
+    en_vuelo = {}
+    for clave in _en_vuelo:
+        endpoint = clave.split(":", 1)[0]
+        en_vuelo[endpoint] = en_vuelo.get(endpoint, 0) + 1
+
+    return {
+        "en_vuelo": en_vuelo,
+        "en_vuelo_total": len(_en_vuelo),
+        "por_endpoint": {endpoint: dict(m) for endpoint, m in _metricas.items()},
+    }
@@ -0,0 +1,250 @@
+import hashlib
+import os
+import threading
+import uuid
+from contextlib import contextmanager
+
+import pandas as pd
+import pyarrow as pa
+
+# ==========================================================
+# Datasets y modelos compartidos entre workers de uvicorn
+# ==========================================================
+#
+# dir/
+#   datasets/<clave>.arrow        ← Arrow IPC sin comprimir, mapeado en memoria
+#   modelos/<id>.bosque           ← formato de src.ml.bosque_compacto
+#   refs/<clave>.<pid>            ← el proceso <pid> tiene el dataset en uso
+#
+# Cada worker adjunta el archivo con mmap de solo lectura: las páginas las
+# comparte el sistema operativo, así que la memoria no crece con el número de
+# workers. Con `dir` en /dev/shm los archivos viven en RAM.
+#
+# Conteo de referencias: dentro de un proceso se cuenta en memoria; entre
+# procesos, la existencia de refs/<clave>.<pid> (de un pid vivo) marca el
+# dataset como en uso y lo protege del desalojo.
+
+_lock = threading.Lock()
+_referencias = {}
+_modelos = {}
+
+
+def directorio_compartido() -> str | None:
+    """Directorio configurado con IASIGHTS_COMPARTIDO_DIR (None = desactivado)."""
+    return os.environ.get("IASIGHTS_COMPARTIDO_DIR")
+
+
+def _limite_bytes() -> int:
+    return int(float(os.environ.get("IASIGHTS_COMPARTIDO_MAX_MB", "1024")) * 1024 * 1024)
+
+
+def clave_contenido(contents: bytes) -> str:
+    """Hash del archivo subido: mismo CSV → misma clave en todos los workers."""
+    return hashlib.blake2b(contents, digest_size=16).hexdigest()
+
+
+def _ruta(tipo: str, nombre: str) -> str:
+    directorio = os.path.join(directorio_compartido(), tipo)
+    os.makedirs(directorio, exist_ok=True)
+    return os.path.join(directorio, nombre)
+
+
+def escribir_atomico(ruta: str, escribir) -> None:
+    """Escribe en un temporal y renombra: ningún worker ve un archivo a medias."""
+    temporal = f"{ruta}.{uuid.uuid4().hex}.tmp"
+    try:
+        escribir(temporal)
+        os.replace(temporal, ruta)
+    finally:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+
+
+# ----------------------------------------------------------
+# Datasets
+# ----------------------------------------------------------
+
+def existe_dataset(clave: str) -> bool:
+    return os.path.exists(_ruta("datasets", f"{clave}.arrow"))
+
+
+def publicar_dataset(clave: str, df: pd.DataFrame) -> None:
+    """
+    Guarda el DataFrame ya validado para que cualquier worker lo adjunte.
+    El que publica debe tener el dataset reservado (`reservar_dataset`) hasta
+    adjuntarlo; aun así la limpieza posterior nunca desaloja el recién publicado.
+    """
+    tabla = pa.Table.from_pandas(df, preserve_index=False)
+
+    def _escribir(ruta):
+        with pa.OSFile(ruta, "wb") as sink:
+            with pa.ipc.new_file(sink, tabla.schema) as writer:
+                writer.write_table(tabla)
+
+    escribir_atomico(_ruta("datasets", f"{clave}.arrow"), _escribir)
+    limpiar_compartido(excluir={clave})
+
+
+def _registrar(clave: str, delta: int) -> None:
+    ruta_ref = _ruta("refs", f"{clave}.{os.getpid()}")
+    with _lock:
+        n = _referencias.get(clave, 0) + delta
+        if n > 0:
+            _referencias[clave] = n
+            if delta > 0 and n == 1:
+                open(ruta_ref, "w").close()
+        else:
+            _referencias.pop(clave, None)
+            if os.path.exists(ruta_ref):
+                os.remove(ruta_ref)
+
+
+@contextmanager
+def reservar_dataset(clave: str):
+    """
+    Referencia al dataset sin adjuntarlo: lo protege del desalojo (propio o de
+    otros workers) entre comprobar que existe / publicarlo y adjuntarlo.
+    """
+    _registrar(clave, +1)
+    try:
+        yield
+    finally:
+        _registrar(clave, -1)
+
+
+def adjuntar_dataset(clave: str) -> pa.Table:
+    """
+    Tabla Arrow respaldada por el archivo mapeado (sin copia, solo lectura).
+    Debe liberarse con `liberar_dataset`; preferir `dataset_compartido`.
+    """
+    ruta = _ruta("datasets", f"{clave}.arrow")
+    _registrar(clave, +1)
+    try:
+        tabla = pa.ipc.open_file(pa.memory_map(ruta, "r")).read_all()
+        os.utime(ruta)  # marca de último uso para el desalojo LRU
+    except Exception:
+        _registrar(clave, -1)
+        raise
+    return tabla
+
+
+def liberar_dataset(clave: str) -> None:
+    _registrar(clave, -1)
+
+
+@contextmanager
+def dataset_compartido(clave: str):
+    """
+    DataFrame del dataset compartido mientras dure el bloque.
+    Las columnas numéricas sin nulos quedan como vistas sobre el mapeo; las de
+    texto se materializan al convertir a pandas.
+    """
+    tabla = adjuntar_dataset(clave)
+    try:
+        yield tabla.to_pandas(split_blocks=True, self_destruct=False)
+    finally:
+        liberar_dataset(clave)
+
+
+def _pid_vivo(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _en_uso() -> set:
+    """Claves con alguna referencia de un proceso vivo; limpia refs huérfanas."""
+    claves = set()
+    directorio = os.path.join(directorio_compartido(), "refs")
+    if not os.path.isdir(directorio):
+        return claves
+    for nombre in os.listdir(directorio):
+        clave, _, pid = nombre.rpartition(".")
+        if pid.isdigit() and _pid_vivo(int(pid)):
+            claves.add(clave)
+        else:
+            os.remove(os.path.join(directorio, nombre))
+    return claves
+
+
+def desalojar_dataset(clave: str) -> bool:
+    """
+    Elimina el dataset si ningún proceso lo tiene en uso.
+    Los mapeos ya abiertos siguen siendo válidos hasta que se cierran.
+    """
+    if clave in _en_uso():
+        return False
+    ruta = _ruta("datasets", f"{clave}.arrow")
+    if os.path.exists(ruta):
+        os.remove(ruta)
+    return True
+
+
+def limpiar_compartido(limite_bytes: int | None = None, excluir=()) -> list:
+    """
+    Desaloja los datasets menos usados recientemente hasta quedar bajo el
+    límite (IASIGHTS_COMPARTIDO_MAX_MB). Nunca desaloja datasets en uso ni
+    las claves de `excluir`.
+
+    Returns:
+        claves desalojadas.
+    """
+    limite = _limite_bytes() if limite_bytes is None else limite_bytes
+    directorio = os.path.join(directorio_compartido(), "datasets")
+    archivos = []
+    for nombre in os.listdir(directorio):
+        if nombre.endswith(".arrow"):
+            estado = os.stat(os.path.join(directorio, nombre))
+            archivos.append((estado.st_mtime, estado.st_size, nombre[:-len(".arrow")]))
+
+    total = sum(tamano for _, tamano, _ in archivos)
+    en_uso = _en_uso()
+    desalojadas = []
+    for _, tamano, clave in sorted(archivos):
+        if total <= limite:
+            break
+        if clave in en_uso or clave in excluir:
+            continue
+        if desalojar_dataset(clave):
+            total -= tamano
+            desalojadas.append(clave)
+    return desalojadas
+
+
+# ----------------------------------------------------------
+# Modelos exportados
+# ----------------------------------------------------------
+
+def cargar_modelo_compartido(ruta: str) -> dict:
+    """
+    Bosque compacto mapeado en memoria, cacheado por proceso y por ruta: todos
+    los workers comparten las mismas páginas del archivo.
+    """
+    from src.ml.bosque_compacto import cargar_bosque_compacto
+
+    mtime = os.stat(ruta).st_mtime
+    with _lock:
+        cacheado = _modelos.get(ruta)
+        if cacheado is None or cacheado[0] != mtime:
+            cacheado = (mtime, cargar_bosque_compacto(ruta))
+            _modelos[ruta] = cacheado
+    return cacheado[1]
+
+
+def estadisticas_compartido() -> dict:
+    """Resumen del directorio compartido para /metrics o diagnóstico."""
+    directorio = os.path.join(directorio_compartido(), "datasets")
+    tamanos = [
+        os.path.getsize(os.path.join(directorio, n))
+        for n in os.listdir(directorio) if n.endswith(".arrow")
+    ] if os.path.isdir(directorio) else []
+    return {
+        "datasets": len(tamanos),
+        "bytes": int(sum(tamanos)),
+        "en_uso_proceso": dict(_referencias),
+        "modelos_cargados": len(_modelos),
+    }
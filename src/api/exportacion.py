@@ -0,0 +1,104 @@
+import io
+import os
+import tempfile
+
+# ==========================================================
+# Serialización incremental de lotes para exportación
+# ==========================================================
+#
+# Cada escritor consume un iterable de DataFrames (mismo esquema) y entrega
+# bytes a medida que los lotes llegan, para usarse con StreamingResponse:
+#   - csv: encabezado con el primer lote y luego filas.
+#   - parquet: un row group por lote; los bytes se envían tras cada lote.
+#   - xlsx: el formato es un zip que solo se cierra al final, así que se
+#     escribe en modo write-only (openpyxl, memoria constante) a un archivo
+#     temporal y se envía por bloques al terminar.
+
+TAMANO_BLOQUE = 1024 * 1024
+
+# Filas máximas por hoja de Excel (incluye encabezado)
+_FILAS_MAX_XLSX = 1_048_576
+
+FORMATOS = {
+    "csv": ("text/csv", "csv"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+    "xlsx": ("application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", "xlsx"),
+}
+
+
+def escribir_csv(lotes):
+    encabezado = True
+    for lote in lotes:
+        yield lote.to_csv(index=False, header=encabezado).encode("utf-8")
+        encabezado = False
+
+
+def _vaciar(buffer: io.BytesIO) -> bytes:
+    """Bytes escritos desde el último vaciado (el writer lleva su propia posición)."""
+    datos = buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+    return datos
+
+
+def escribir_parquet(lotes):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    salida = io.BytesIO()
+    writer = None
+    for lote in lotes:
+        if writer is None:
+            tabla = pa.Table.from_pandas(lote, preserve_index=False)
+            writer = pq.ParquetWriter(salida, tabla.schema)
+        else:
+            # Mismo esquema que el primer lote (ej: enteros → float si hace falta)
+            tabla = pa.Table.from_pandas(lote, schema=writer.schema, preserve_index=False)
+        writer.write_table(tabla)
+        yield _vaciar(salida)
+
+    if writer is not None:
+        writer.close()
+        yield _vaciar(salida)
+
+
+def escribir_xlsx(lotes, hoja: str = "datos"):
+    from openpyxl import Workbook
+
+    libro = Workbook(write_only=True)
+    fd, ruta = tempfile.mkstemp(suffix=".xlsx")
+    os.close(fd)
+    try:
+        actual, filas, n_hojas = None, 0, 0
+        for lote in lotes:
+            columnas = list(lote.columns)
+            # NaN/NaT → celdas vacías
+            valores = lote.astype(object).where(lote.notna(), None)
+            for fila in valores.itertuples(index=False, name=None):
+                if actual is None or filas >= _FILAS_MAX_XLSX:
+                    n_hojas += 1
+                    actual = libro.create_sheet(hoja if n_hojas == 1 else f"{hoja}_{n_hojas}")
+                    actual.append(columnas)
+                    filas = 1
+                actual.append(list(fila))
+                filas += 1
+        if actual is None:
+            libro.create_sheet(hoja)
+        libro.save(ruta)
+
+        with open(ruta, "rb") as f:
+            while bloque := f.read(TAMANO_BLOQUE):
+                yield bloque
+    finally:
+        os.remove(ruta)
+
+
+def serializar(lotes, formato: str):
+    """Generador de bytes del archivo en el formato pedido."""
+    if formato == "csv":
+        return escribir_csv(lotes)
+    if formato == "parquet":
+        return escribir_parquet(lotes)
+    if formato == "xlsx":
+        return escribir_xlsx(lotes)
+    raise ValueError(f"Formato no reconocido: {formato}")
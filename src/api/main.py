@@ -1,34 +1,267 @@
-from fastapi import FastAPI, UploadFile, File
-import pandas as pd
+from collections import OrderedDict
+from contextlib import ExitStack, asynccontextmanager, contextmanager
+from fastapi import FastAPI, UploadFile, File, Header, HTTPException, Request
+import hashlib
+import importlib
 import io
+import os
+import threading
+
+# BLAS/OpenMP a un hilo por defecto: el paralelismo se reparte entre
+# peticiones con el presupuesto de CPU (src/utils/cpu.py), que sube el límite
+# solo dentro de cada reserva. Debe fijarse antes de que se importe numpy
+# (threadpoolctl solo controla bibliotecas ya cargadas).
+for _variable in ("OPENBLAS_NUM_THREADS", "OMP_NUM_THREADS", "MKL_NUM_THREADS"):
+    os.environ.setdefault(_variable, "1")
+
+from starlette.concurrency import run_in_threadpool
+
+from src.api.coalescencia import clave_peticion, metricas_coalescencia, una_sola_vez
+from src.api.perfilado import MODOS_PERFIL, activar_perfil, token_valido
+
+# pandas, sklearn y los módulos de análisis NO se importan aquí: cada endpoint
+# los importa en su primer uso para que /health responda sin pagar ese costo
+# en cada reinicio de worker o escalado de contenedores.
+
+# Módulos pesados que el precalentamiento importa en segundo plano
+_MODULOS_PESADOS = [
+    "pandas",
+    "src.ingestion.validator",
+    "src.analytics.basico",
+    "src.analytics.filtros",
+    "src.ml.bosque_compacto",
+    "src.ml.modelo_ventas",
+    "sklearn.ensemble",
+    "sklearn.model_selection",
+]
+
+
+def _precalentar() -> None:
+    for modulo in _MODULOS_PESADOS:
+        importlib.import_module(modulo)
+
+
+@asynccontextmanager
+async def _ciclo_de_vida(app: FastAPI):
+    # Precalentamiento opcional: el servidor ya acepta peticiones mientras
+    # los módulos pesados se importan en un hilo aparte.
+    if os.environ.get("IASIGHTS_PRECALENTAR", "0") == "1":
+        threading.Thread(target=_precalentar, name="precalentar", daemon=True).start()
+    yield
 
-from src.ingestion.validator import cargar_csv
-from src.analytics.basico import resumen_general, ventas_diarias
-from src.analytics.filtros import filtrar_por_periodo
-from src.ml.modelo_ventas import entrenar_y_predecir_ventas_diarias
 
 app = FastAPI(
     title="iasights API",
     description="Backend para análisis automatizado de ventas",
-    version="0.1.0"
+    version="0.1.0",
+    lifespan=_ciclo_de_vida
 )
 
+# Directorio opcional donde se exportan los modelos entrenados en formato
+# compacto; si no está definido no se exporta nada.
+MODELOS_DIR = os.environ.get("IASIGHTS_MODELOS_DIR")
+
+
+# Directorio raíz del almacén Parquet de datasets ingeridos (un subdirectorio
+# por dataset); si no está definido los endpoints /datasets no están activos.
+ALMACEN_DIR = os.environ.get("IASIGHTS_ALMACEN_DIR")
+
+
+# Directorio compartido entre workers (idealmente en /dev/shm) para datasets
+# parseados y modelos exportados; ver src/api/compartido.py.
+COMPARTIDO_DIR = os.environ.get("IASIGHTS_COMPARTIDO_DIR")
+
+
+def _directorio_modelos() -> str | None:
+    if MODELOS_DIR:
+        return MODELOS_DIR
+    if COMPARTIDO_DIR:
+        return os.path.join(COMPARTIDO_DIR, "modelos")
+    return None
+
+
+def _ruta_modelo(modelo_id: str) -> str:
+    return os.path.join(_directorio_modelos(), f"{modelo_id}.bosque")
+
+
+@contextmanager
+def _dataset_subido(contents: bytes):
+    """
+    DataFrame validado del CSV subido. Con IASIGHTS_COMPARTIDO_DIR el CSV se
+    parsea una sola vez: los demás workers (y peticiones posteriores) adjuntan
+    el mismo dataset en memoria compartida identificado por el hash del archivo.
+    """
+    import pandas as pd
+    from src.ingestion.validator import cargar_csv
+
+    if not COMPARTIDO_DIR:
+        yield cargar_csv(pd.read_csv(io.BytesIO(contents)))
+        return
+
+    from src.api.compartido import (
+        clave_contenido,
+        dataset_compartido,
+        existe_dataset,
+        publicar_dataset,
+        reservar_dataset,
+    )
+
+    clave = clave_contenido(contents)
+    df = None
+    with ExitStack() as pila:
+        # La referencia se toma antes de publicar: ni la limpieza que dispara
+        # la publicación ni la de otro worker pueden desalojar el dataset
+        # antes de adjuntarlo.
+        pila.enter_context(reservar_dataset(clave))
+        if not existe_dataset(clave):
+            df = cargar_csv(pd.read_csv(io.BytesIO(contents)))
+            publicar_dataset(clave, df)
+        try:
+            df = pila.enter_context(dataset_compartido(clave))
+        except FileNotFoundError:
+            # Desalojado de todos modos (carrera con otro worker): se usa el
+            # CSV subido en lugar de fallar la petición
+            if df is None:
+                df = cargar_csv(pd.read_csv(io.BytesIO(contents)))
+        yield df
+
+
+def _filtrar_periodo(df, periodo: str):
+    """`filtrar_por_periodo` con los periodos no reconocidos como 400."""
+    from src.analytics.filtros import filtrar_por_periodo
+
+    try:
+        return filtrar_por_periodo(df, periodo)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _ruta_dataset(nombre: str, debe_existir: bool = True) -> str:
+    if not ALMACEN_DIR or not nombre.replace("-", "").replace("_", "").isalnum():
+        raise HTTPException(status_code=404, detail="Dataset no encontrado.")
+    ruta = os.path.join(ALMACEN_DIR, nombre)
+    if debe_existir and not os.path.isdir(ruta):
+        raise HTTPException(status_code=404, detail="Dataset no encontrado.")
+    return ruta
+
+
+@app.middleware("http")
+async def _perfilado_bajo_demanda(request: Request, call_next):
+    """
+    Con X-IASights-Perfil: muestreo|completo y X-IASights-Admin-Token válido,
+    el cálculo de la petición corre bajo el perfilador (sin coalescencia) y
+    la respuesta lleva X-IASights-Perfil-Id para descargarlo en /admin/perfiles.
+    """
+    modo = request.headers.get("x-iasights-perfil")
+    if modo is None:
+        return await call_next(request)
+
+    from fastapi.responses import JSONResponse
+
+    if not token_valido(request.headers.get("x-iasights-admin-token")):
+        return JSONResponse(status_code=403, content={"detail": "Perfilado no autorizado."})
+    if modo not in MODOS_PERFIL:
+        return JSONResponse(status_code=400, content={"detail": f"Modo de perfilado no reconocido: {modo}"})
+
+    solicitud = activar_perfil(modo, {
+        "ruta": request.url.path,
+        "query": dict(request.query_params),
+        "content_length": int(request.headers.get("content-length", 0)),
+    })
+    respuesta = await call_next(request)
+    if solicitud["id"] is not None:
+        respuesta.headers["X-IASights-Perfil-Id"] = solicitud["id"]
+    return respuesta
+
+
+def _verificar_admin(token: str | None) -> None:
+    from src.api.perfilado import ADMIN_TOKEN
+
+    # Sin token configurado los endpoints de administración no existen
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not token_valido(token):
+        raise HTTPException(status_code=403, detail="Token de administración inválido.")
+
 
 @app.get("/health")
 def health_check():
     return {"status": "ok"}
 
 
+@app.get("/metrics")
+def metrics():
+    """
+    Métricas del proceso: peticiones en vuelo y coalescidas por endpoint, uso
+    del presupuesto de CPU (tiempo en cola por tipo de trabajo) y, si está
+    activo, estado del directorio compartido.
+    """
+    from src.utils.cpu import metricas_cpu
+
+    respuesta = {
+        "pid": os.getpid(),
+        "coalescencia": metricas_coalescencia(),
+        "cpu": metricas_cpu(),
+    }
+    if COMPARTIDO_DIR:
+        from src.api.compartido import estadisticas_compartido
+        respuesta["compartido"] = estadisticas_compartido()
+    return respuesta
+
+
+@app.get("/admin/perfiles")
+def listar_perfiles_endpoint(
+    limite: int = 20,
+    x_iasights_admin_token: str | None = Header(default=None)
+):
+    """Perfiles guardados más recientes (metadatos)."""
+    from src.api.perfilado import listar_perfiles
+
+    _verificar_admin(x_iasights_admin_token)
+    return {"perfiles": listar_perfiles(limite)}
+
+
+@app.get("/admin/perfiles/{perfil_id}")
+def descargar_perfil(
+    perfil_id: str,
+    formato: str = "speedscope",
+    x_iasights_admin_token: str | None = Header(default=None)
+):
+    """
+    Descarga un perfil: speedscope (JSON para speedscope.app), collapsed
+    (flamegraph.pl), prof (pstats, solo modo completo) o meta.
+    """
+    from fastapi.responses import FileResponse
+    from src.api.perfilado import FORMATOS_PERFIL, ruta_perfil
+
+    _verificar_admin(x_iasights_admin_token)
+    if formato not in FORMATOS_PERFIL:
+        raise HTTPException(status_code=400, detail=f"Formato no reconocido: {formato}")
+
+    ruta = ruta_perfil(perfil_id, formato)
+    if ruta is None:
+        raise HTTPException(status_code=404, detail="Perfil no encontrado.")
+    return FileResponse(
+        ruta,
+        media_type=FORMATOS_PERFIL[formato][1],
+        filename=os.path.basename(ruta)
+    )
+
+
 @app.post("/summary")
 async def summary_endpoint(file: UploadFile = File(...)):
     """
     Recibe un archivo CSV y devuelve un resumen general del dataset.
     """
     contents = await file.read()
-    df = pd.read_csv(io.BytesIO(contents))
-    df = cargar_csv(df) if isinstance(df, pd.DataFrame) else cargar_csv(file)
+    return await una_sola_vez(clave_peticion("summary", contents), _summary, contents)
+
+
+def _summary(contents: bytes) -> dict:
+    from src.analytics.basico import resumen_general
 
-    resumen = resumen_general(df)
+    with _dataset_subido(contents) as df:
+        resumen = resumen_general(df)
     return resumen
 
 
@@ -38,6 +271,15 @@ async def ventas_diarias_endpoint(file: UploadFile = File(...)):
     Recibe un archivo CSV y devuelve ventas agregadas por día.
     """
     contents = await file.read()
+    return await una_sola_vez(
+        clave_peticion("ventas-diarias", contents), _ventas_diarias, contents
+    )
+
+
+def _ventas_diarias(contents: bytes) -> list:
+    import pandas as pd
+    from src.analytics.basico import ventas_diarias
+
     df = pd.read_csv(io.BytesIO(contents))
     df = df.dropna(subset=["transaction_date"])
     df["transaction_date"] = pd.to_datetime(df["transaction_date"])
@@ -46,27 +288,490 @@ async def ventas_diarias_endpoint(file: UploadFile = File(...)):
 
     return ventas.to_dict(orient="records")
 
+
 @app.post("/forecast-sales")
 async def forecast_sales(
     file: UploadFile = File(...),
     periodo: str = "ultimo_mes",
-    dias_futuro: int = 7
+    dias_futuro: int = 7,
+    intervalos: bool = False
 ):
-    # Leer CSV
     contents = await file.read()
-    df = pd.read_csv(io.BytesIO(contents))
+    return await una_sola_vez(
+        clave_peticion(
+            "forecast-sales", contents,
+            periodo=periodo, dias_futuro=dias_futuro, intervalos=intervalos
+        ),
+        _forecast_sales, contents, periodo, dias_futuro, intervalos
+    )
 
-    # Validaciones iniciales
-    df = cargar_csv(df)
 
-    # Filtrar periodo
-    df_filtrado = filtrar_por_periodo(df, periodo)
+def _forecast_sales(contents: bytes, periodo: str, dias_futuro: int, intervalos: bool) -> dict:
+    from src.ml.modelo_ventas import (
+        CUANTILES_INTERVALO,
+        entrenar_y_predecir_ventas_diarias,
+        exportar_modelo_ventas,
+    )
 
-    # Entrenar y predecir
-    resultados = entrenar_y_predecir_ventas_diarias(df_filtrado, dias_futuro)
+    # Leer CSV y validaciones iniciales
+    with _dataset_subido(contents) as df:
+        # Filtrar periodo
+        df_filtrado = _filtrar_periodo(df, periodo)
 
-    return {
+        # Entrenar y predecir
+        resultados = entrenar_y_predecir_ventas_diarias(
+            df_filtrado,
+            dias_futuro,
+            cuantiles=CUANTILES_INTERVALO if intervalos else None
+        )
+
+    respuesta = {
         "historico": resultados["historico"].to_dict(orient="records"),
         "predicciones_futuras": resultados["predicciones_futuras"].to_dict(orient="records"),
         "metricas_modelo": resultados["metricas_modelo"]
-    }
\ No newline at end of file
+    }
+
+    # Exportar el modelo para servir predicciones posteriores sin reentrenar
+    if _directorio_modelos() and resultados["modelo"] is not None:
+        modelo_id = hashlib.sha256(
+            contents + f"|{periodo}".encode("utf-8")
+        ).hexdigest()[:32]
+        os.makedirs(_directorio_modelos(), exist_ok=True)
+        ruta = _ruta_modelo(modelo_id)
+        # Mismo CSV y periodo → mismo modelo. Nunca se reescribe en el lugar:
+        # otros workers pueden tener el archivo mapeado en memoria (truncarlo
+        # los mata con SIGBUS), así que se publica con temporal + rename.
+        if not os.path.exists(ruta):
+            from src.api.compartido import escribir_atomico
+            escribir_atomico(ruta, lambda temporal: exportar_modelo_ventas(resultados, temporal))
+        respuesta["modelo_id"] = modelo_id
+
+    return respuesta
+
+
+@app.get("/forecast-sales/{modelo_id}")
+def forecast_sales_exportado(
+    modelo_id: str,
+    dias_futuro: int = 7,
+    intervalos: bool = False
+):
+    """
+    Predice con un modelo exportado previamente por /forecast-sales,
+    sin volver a cargar el CSV ni entrenar.
+    """
+    from src.api.compartido import cargar_modelo_compartido
+    from src.ml.modelo_ventas import CUANTILES_INTERVALO, predecir_con_modelo_exportado
+
+    if not _directorio_modelos() or not modelo_id.isalnum():
+        raise HTTPException(status_code=404, detail="Modelo no encontrado.")
+    ruta = _ruta_modelo(modelo_id)
+    if not os.path.exists(ruta):
+        raise HTTPException(status_code=404, detail="Modelo no encontrado.")
+
+    bosque = cargar_modelo_compartido(ruta)
+    predicciones = predecir_con_modelo_exportado(
+        bosque,
+        dias_futuro,
+        cuantiles=CUANTILES_INTERVALO if intervalos else None
+    )
+    return {
+        "predicciones_futuras": predicciones.to_dict(orient="records"),
+        "metricas_modelo": bosque["metadatos"]["metricas_modelo"]
+    }
+
+
+# Un lock por dataset y uso ("ingesta", "pronostico"): las operaciones sobre
+# un dataset se serializan sin bloquear las de otros datasets.
+_locks_datasets = {}
+_lock_registro = threading.Lock()
+
+
+def _lock_dataset(nombre: str, uso: str) -> threading.Lock:
+    with _lock_registro:
+        return _locks_datasets.setdefault((uso, nombre), threading.Lock())
+
+
+@app.post("/datasets/{nombre}")
+async def ingerir_dataset(nombre: str, file: UploadFile = File(...)):
+    """
+    Agrega un CSV al almacén Parquet del dataset `nombre` (particionado por
+    mes, con rollups diario/semanal/mensual).
+    """
+    ruta = _ruta_dataset(nombre, debe_existir=False)
+    contents = await file.read()
+    # Parseo y escritura en el threadpool: no bloquean el event loop
+    return await run_in_threadpool(_ingerir_dataset, nombre, ruta, contents)
+
+
+def _ingerir_dataset(nombre: str, ruta: str, contents: bytes) -> dict:
+    import pandas as pd
+    from src.ingestion.validator import cargar_csv
+    from src.ingestion.almacen import guardar_dataset
+
+    df = cargar_csv(pd.read_csv(io.BytesIO(contents)))
+    with _lock_dataset(nombre, "ingesta"):
+        meses = guardar_dataset(df, ruta)
+    return {"dataset": nombre, "filas": int(len(df)), "meses_actualizados": meses}
+
+
+@app.get("/datasets/{nombre}/summary")
+def summary_dataset(nombre: str, periodo: str | None = None):
+    """
+    Resumen general del periodo leyendo solo las particiones y columnas necesarias.
+    """
+    from src.ingestion.almacen import leer_periodo
+    from src.analytics.basico import resumen_general
+
+    try:
+        df = leer_periodo(
+            _ruta_dataset(nombre),
+            periodo,
+            columnas=["invoice_id", "customer_id", "product_id", "product_subtotal"]
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if df.empty:
+        raise HTTPException(status_code=404, detail="Sin datos para el periodo.")
+    return resumen_general(df)
+
+
+@app.get("/datasets/{nombre}/ventas-diarias")
+def ventas_diarias_dataset(nombre: str, periodo: str | None = None):
+    """
+    Ventas diarias del periodo servidas desde el rollup diario materializado.
+    """
+    from src.ingestion.almacen import ventas_diarias_almacen
+
+    try:
+        ventas = ventas_diarias_almacen(_ruta_dataset(nombre), periodo)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return ventas.to_dict(orient="records")
+
+
+# Último modelo de pronóstico por dataset (por proceso); se refresca de forma
+# incremental cuando el almacén recibe días nuevos. Solo se conservan los
+# IASIGHTS_PRONOSTICOS_MAX datasets usados más recientemente (cada uno guarda
+# un bosque completo).
+PRONOSTICOS_MAX = int(os.environ.get("IASIGHTS_PRONOSTICOS_MAX", "8"))
+_pronosticos_dataset = OrderedDict()
+
+
+def _pronostico_guardado(nombre: str) -> dict | None:
+    with _lock_registro:
+        previo = _pronosticos_dataset.get(nombre)
+        if previo is not None:
+            _pronosticos_dataset.move_to_end(nombre)
+        return previo
+
+
+def _guardar_pronostico(nombre: str, resultados: dict) -> None:
+    with _lock_registro:
+        _pronosticos_dataset[nombre] = resultados
+        _pronosticos_dataset.move_to_end(nombre)
+        while len(_pronosticos_dataset) > PRONOSTICOS_MAX:
+            _pronosticos_dataset.popitem(last=False)
+
+
+@app.get("/datasets/{nombre}/forecast")
+def forecast_dataset(nombre: str, dias_futuro: int = 7, intervalos: bool = False):
+    """
+    Pronóstico del dataset a partir de su rollup diario. La primera llamada
+    entrena el bosque completo; las siguientes solo lo actualizan con los días
+    nuevos (reentrenamiento completo ante deriva o por calendario).
+    """
+    from src.ingestion.almacen import leer_rollup
+    from src.ml.modelo_ventas import (
+        CUANTILES_INTERVALO,
+        actualizar_modelo_ventas,
+        entrenar_y_predecir_ventas_diarias,
+    )
+
+    diario = leer_rollup(_ruta_dataset(nombre), "diario")
+    entrada = diario[["transaction_date", "total_ventas"]].rename(columns={"total_ventas": "product_subtotal"})
+    cuantiles = CUANTILES_INTERVALO if intervalos else None
+
+    # Lock por dataset: reentrenar un dataset no bloquea los pronósticos de otros
+    with _lock_dataset(nombre, "pronostico"):
+        previo = _pronostico_guardado(nombre)
+        motivo = "primer entrenamiento"
+        if previo is not None and previo["modelo"] is not None:
+            # Si cambiaron días ya entrenados (ej: se ingirió un mes atrasado)
+            # la actualización incremental no aplica.
+            ultima = previo["historico"]["transaction_date"].max()
+            conocido = entrada.loc[entrada["transaction_date"] <= ultima, "product_subtotal"].sum()
+            if abs(conocido - previo["historico"]["ventas_totales"].sum()) > 1e-6 * max(abs(conocido), 1.0):
+                previo, motivo = None, "cambiaron días ya entrenados"
+
+        if previo is None or previo["modelo"] is None:
+            resultados = entrenar_y_predecir_ventas_diarias(entrada, dias_futuro, cuantiles=cuantiles)
+            resultados["metricas_modelo"].update(modo="completo", motivo=motivo)
+        else:
+            resultados = actualizar_modelo_ventas(previo, entrada, dias_futuro, cuantiles=cuantiles)
+        _guardar_pronostico(nombre, resultados)
+
+    return {
+        "predicciones_futuras": resultados["predicciones_futuras"].to_dict(orient="records"),
+        "metricas_modelo": resultados["metricas_modelo"],
+    }
+
+
+@app.get("/datasets/{nombre}/export")
+def exportar_dataset(
+    nombre: str,
+    tabla: str = "ventas_diarias",
+    formato: str = "parquet",
+    periodo: str | None = None,
+    n: int = 100,
+    dias_futuro: int = 7
+):
+    """
+    Exporta una tabla del dataset (ventas diarias, top productos/clientes,
+    patrones horarios o pronóstico) como Parquet, CSV o XLSX. El archivo se
+    genera por lotes (una partición mensual a la vez) y se envía en streaming.
+    """
+    import itertools
+    from fastapi.responses import StreamingResponse
+    from src.analytics.exportacion import TABLAS_EXPORTACION, lotes_exportacion
+    from src.api.exportacion import FORMATOS, serializar
+
+    if tabla not in TABLAS_EXPORTACION:
+        raise HTTPException(status_code=400, detail=f"Tabla no reconocida: {tabla}")
+    if formato not in FORMATOS:
+        raise HTTPException(status_code=400, detail=f"Formato no reconocido: {formato}")
+
+    # El primer lote se calcula antes de responder para que los errores
+    # (ej: periodo inválido) lleguen como 400 y no como un archivo cortado.
+    lotes = lotes_exportacion(_ruta_dataset(nombre), tabla, periodo, n, dias_futuro)
+    try:
+        primero = next(lotes, None)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if primero is None:
+        raise HTTPException(status_code=404, detail="Sin datos para el periodo.")
+    lotes = itertools.chain([primero], lotes)
+
+    tipo, extension = FORMATOS[formato]
+    return StreamingResponse(
+        serializar(lotes, formato),
+        media_type=tipo,
+        headers={"Content-Disposition": f'attachment; filename="{nombre}_{tabla}.{extension}"'}
+    )
+
+
+@app.post("/clientes-rfm")
+async def clientes_rfm_endpoint(file: UploadFile = File(...), detalle: bool = False):
+    """
+    Recibe un archivo CSV y devuelve la segmentación RFM de clientes y la
+    matriz de retención por cohorte mensual de adquisición.
+    """
+    contents = await file.read()
+    return await una_sola_vez(
+        clave_peticion("clientes-rfm", contents, detalle=detalle),
+        _clientes_rfm, contents, detalle
+    )
+
+
+def _clientes_rfm(contents: bytes, detalle: bool) -> dict:
+    from src.analytics.clientes import (
+        actualizar_estado_clientes,
+        calcular_rfm,
+        estado_clientes_nuevo,
+        matriz_cohortes,
+    )
+
+    with _dataset_subido(contents) as df:
+        estado = actualizar_estado_clientes(estado_clientes_nuevo(), df)
+    rfm = calcular_rfm(estado)
+    cohortes = matriz_cohortes(estado)
+
+    segmentos = (
+        rfm.groupby("segmento")
+           .agg(
+               n_clientes=("customer_id", "size"),
+               frecuencia_promedio=("frecuencia", "mean"),
+               monetario_promedio=("monetario", "mean"),
+           )
+           .reset_index()
+    )
+
+    respuesta = {
+        "n_clientes": int(len(rfm)),
+        "segmentos": segmentos.to_dict(orient="records"),
+        # Celdas aún no observadas (NaN) → null
+        "retencion_cohortes": cohortes.astype(object).where(cohortes.notna(), None).to_dict(orient="index"),
+    }
+    if detalle:
+        respuesta["clientes"] = rfm.to_dict(orient="records")
+    return respuesta
+
+
+@app.post("/canasta")
+async def canasta_endpoint(
+    file: UploadFile = File(...),
+    soporte_minimo: float = 0.001,
+    top_n: int = 5,
+    product_id: str | None = None
+):
+    """
+    Recibe un archivo CSV y devuelve, por producto, los productos que más se
+    compran en la misma factura (soporte, confianza y lift).
+    """
+    contents = await file.read()
+    return await una_sola_vez(
+        clave_peticion(
+            "canasta", contents,
+            soporte_minimo=soporte_minimo, top_n=top_n, product_id=product_id
+        ),
+        _canasta, contents, soporte_minimo, top_n, product_id
+    )
+
+
+def _canasta(contents: bytes, soporte_minimo: float, top_n: int, product_id: str | None) -> dict:
+    import pandas as pd
+    from src.analytics.canasta import calcular_canasta, pares_relacionados
+
+    # Se lee completo (solo tres columnas): las líneas de una factura no
+    # tienen por qué estar contiguas y una factura repartida entre chunks se
+    # contaría dos veces y perdería sus pares.
+    df = pd.read_csv(
+        io.BytesIO(contents),
+        usecols=["invoice_id", "product_id", "product_name"]
+    )
+    estado = calcular_canasta(df)
+
+    # product_id llega como texto; se busca con el tipo de los IDs del archivo
+    # (uno no numérico queda en NaN: no coincide con ningún producto)
+    if product_id is not None and pd.api.types.is_numeric_dtype(estado["productos"]):
+        product_id = pd.to_numeric(product_id, errors="coerce")
+
+    pares = pares_relacionados(estado, soporte_minimo, top_n, product_id)
+    return {
+        "n_facturas": int(estado["n_facturas"]),
+        "n_productos": int(len(estado["productos"])),
+        "pares": pares.to_dict(orient="records"),
+    }
+
+
+@app.post("/comparar-periodos")
+async def comparar_periodos_endpoint(
+    file: UploadFile = File(...),
+    periodo: str = "ultimo_mes",
+    referencia: str = "anterior"
+):
+    """
+    Recibe un archivo CSV y compara ventas, ítems y facturas del periodo
+    contra el periodo anterior ("anterior") o el mismo periodo del año
+    anterior ("anio_anterior"), usando el índice diario acumulado.
+    """
+    if referencia not in ("anterior", "anio_anterior"):
+        raise HTTPException(status_code=400, detail=f"Referencia no reconocida: {referencia}")
+
+    contents = await file.read()
+    return await una_sola_vez(
+        clave_peticion("comparar-periodos", contents, periodo=periodo, referencia=referencia),
+        _comparar_periodos, contents, periodo, referencia
+    )
+
+
+def _comparar_periodos(contents: bytes, periodo: str, referencia: str) -> dict:
+    from src.analytics.filtros import rango_periodo
+    from src.analytics.indice_diario import (
+        comparar_periodos,
+        construir_indice_diario,
+        serie_diaria,
+    )
+
+    with _dataset_subido(contents) as df:
+        indice = construir_indice_diario(df)
+        try:
+            inicio, fin = rango_periodo(df["transaction_date"], periodo)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    comparacion = comparar_periodos(indice, inicio, fin, referencia)
+    comparacion["serie_diaria"] = serie_diaria(indice, inicio, fin).to_dict(orient="records")
+    return comparacion
+
+
+@app.post("/anomalias")
+async def anomalias_endpoint(
+    file: UploadFile = File(...),
+    granularidad: str = "diaria",
+    umbral: float = 3.0,
+    solo_anomalias: bool = True
+):
+    """
+    Recibe un archivo CSV y marca los días ("diaria") o franjas de 3 horas
+    ("horaria") cuyas ventas se desvían más de `umbral` desviaciones del nivel
+    esperado para ese día de la semana (y franja).
+    """
+    if granularidad not in ("diaria", "horaria"):
+        raise HTTPException(status_code=400, detail=f"Granularidad no reconocida: {granularidad}")
+
+    contents = await file.read()
+    return await una_sola_vez(
+        clave_peticion(
+            "anomalias", contents,
+            granularidad=granularidad, umbral=umbral, solo_anomalias=solo_anomalias
+        ),
+        _anomalias, contents, granularidad, umbral, solo_anomalias
+    )
+
+
+def _anomalias(contents: bytes, granularidad: str, umbral: float, solo_anomalias: bool) -> dict:
+    from src.analytics.anomalias import detectar_anomalias_diarias, detectar_anomalias_horarias
+
+    detectar = detectar_anomalias_diarias if granularidad == "diaria" else detectar_anomalias_horarias
+    with _dataset_subido(contents) as df:
+        resultado, _ = detectar(df, umbral=umbral)
+
+    n_evaluados = int(resultado["z"].notna().sum()) if not resultado.empty else 0
+    if solo_anomalias and not resultado.empty:
+        resultado = resultado[resultado["anomalia"]]
+
+    resultado = resultado.astype(object).where(resultado.notna(), None)
+    return {
+        "granularidad": granularidad,
+        "n_evaluados": n_evaluados,
+        "n_anomalias": int(resultado["anomalia"].sum()) if not resultado.empty else 0,
+        "puntos": resultado.to_dict(orient="records"),
+    }
+
+
+@app.post("/forecast-hourly")
+async def forecast_hourly(
+    file: UploadFile = File(...),
+    periodo: str = "ultimos_90_dias",
+    dias_futuro: int = 7
+):
+    """
+    Recibe un archivo CSV y devuelve el pronóstico de ventas por hora para
+    los próximos días: una fila por fecha con las 24 horas (grilla 7 × 24
+    por defecto), útil para planificar turnos.
+    """
+    contents = await file.read()
+    return await una_sola_vez(
+        clave_peticion("forecast-hourly", contents, periodo=periodo, dias_futuro=dias_futuro),
+        _forecast_hourly, contents, periodo, dias_futuro
+    )
+
+
+def _forecast_hourly(contents: bytes, periodo: str, dias_futuro: int) -> dict:
+    from src.ml.pronostico_horario import N_HORAS, pronosticar_ventas_horarias
+
+    with _dataset_subido(contents) as df:
+        resultados = pronosticar_ventas_horarias(_filtrar_periodo(df, periodo), dias_futuro)
+
+    grilla = resultados["grilla"]
+    return {
+        "grilla": [
+            {
+                "transaction_date": fecha,
+                "Día": fila["Día"],
+                "prediccion": [float(fila[h]) for h in range(N_HORAS)],
+            }
+            for fecha, fila in grilla.iterrows()
+        ],
+        "metricas_modelo": resultados["metricas_modelo"],
+    }
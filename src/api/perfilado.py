@@ -0,0 +1,276 @@
+import contextvars
+import hmac
+import inspect
+import json
+import os
+import re
+import secrets
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+
+# ==========================================================
+# Perfilado bajo demanda de peticiones
+# ==========================================================
+#
+# Una petición con la cabecera X-IASights-Perfil y el token de administración
+# correcto (IASIGHTS_ADMIN_TOKEN) ejecuta su cálculo bajo un perfilador:
+#   - muestreo: un hilo aparte lee la pila del hilo de trabajo cada
+#     `INTERVALO_MUESTREO` segundos (sys._current_frames). Sobrecarga baja.
+#   - completo: además del muestreo, cProfile determinista sobre el mismo
+#     hilo (.prof para pstats / snakeviz).
+# Cada perfil se guarda en IASIGHTS_PERFILES_DIR como:
+#   {id}.json             metadatos (endpoint, parámetros, tamaño, duración)
+#   {id}.collapsed        pilas colapsadas (flamegraph.pl, speedscope)
+#   {id}.speedscope.json  perfil muestreado para https://www.speedscope.app
+#   {id}.prof             solo en modo completo
+# Solo se conservan los `MAX_PERFILES` más recientes.
+
+ADMIN_TOKEN = os.environ.get("IASIGHTS_ADMIN_TOKEN")
+
+PERFILES_DIR = os.environ.get(
+    "IASIGHTS_PERFILES_DIR", os.path.join(tempfile.gettempdir(), "iasights_perfiles")
+)
+
+MAX_PERFILES = int(os.environ.get("IASIGHTS_PERFILES_MAX", "50"))
+
+INTERVALO_MUESTREO = 0.005
+
+MODOS_PERFIL = ("muestreo", "completo")
+
+# Extensión y media type de cada archivo descargable
+FORMATOS_PERFIL = {
+    "meta": (".json", "application/json"),
+    "collapsed": (".collapsed", "text/plain"),
+    "speedscope": (".speedscope.json", "application/json"),
+    "prof": (".prof", "application/octet-stream"),
+}
+
+_ID_VALIDO = re.compile(r"^[A-Za-z0-9_-]+$")
+
+# Perfil solicitado por la petición en curso (None = sin perfilar)
+_perfil_actual = contextvars.ContextVar("perfil_actual", default=None)
+
+# cProfile no admite dos perfiles deterministas a la vez en Python ≥ 3.12
+_lock_cprofile = threading.Lock()
+
+
+def token_valido(token: str | None) -> bool:
+    """True si el perfilado está habilitado y el token coincide."""
+    if not ADMIN_TOKEN or not token:
+        return False
+    return hmac.compare_digest(token.encode("utf-8"), ADMIN_TOKEN.encode("utf-8"))
+
+
+def activar_perfil(modo: str, metadatos: dict):
+    """
+    Marca la petición en curso como perfilada. Devuelve el dict de la
+    solicitud; `perfilar` le agrega el id del perfil guardado.
+    """
+    solicitud = {"modo": modo, "metadatos": metadatos, "id": None}
+    _perfil_actual.set(solicitud)
+    return solicitud
+
+
+def perfil_solicitado() -> dict | None:
+    return _perfil_actual.get()
+
+
+# ==========================================================
+# Muestreo de pilas
+# ==========================================================
+
+def _nombre_frame(frame) -> str:
+    codigo = frame.f_code
+    return f"{codigo.co_name} ({os.path.basename(codigo.co_filename)}:{codigo.co_firstlineno})"
+
+
+class _Muestreador(threading.Thread):
+    """Cuenta las pilas del hilo `objetivo` por encima de `frame_base`."""
+
+    def __init__(self, objetivo: int, frame_base, intervalo: float):
+        super().__init__(name="perfilado-muestreo", daemon=True)
+        self.objetivo = objetivo
+        self.frame_base = frame_base
+        self.intervalo = intervalo
+        self.pilas = Counter()
+        self.archivos = {}
+        self._detener = threading.Event()
+
+    def run(self):
+        while not self._detener.wait(self.intervalo):
+            frame = sys._current_frames().get(self.objetivo)
+            pila = []
+            while frame is not None and frame is not self.frame_base:
+                nombre = _nombre_frame(frame)
+                self.archivos.setdefault(nombre, (frame.f_code.co_filename, frame.f_code.co_firstlineno))
+                pila.append(nombre)
+                frame = frame.f_back
+            if pila:
+                self.pilas[tuple(reversed(pila))] += 1
+
+    def detener(self):
+        self._detener.set()
+        self.join()
+
+
+def _collapsed(pilas: Counter) -> str:
+    return "".join(f"{';'.join(pila)} {n}\n" for pila, n in pilas.most_common())
+
+
+def _speedscope(pilas: Counter, archivos: dict, nombre: str, duracion: float) -> dict:
+    indices = {}
+    frames = []
+    for pila in pilas:
+        for f in pila:
+            if f not in indices:
+                indices[f] = len(frames)
+                archivo, linea = archivos[f]
+                frames.append({"name": f, "file": archivo, "line": linea})
+
+    total = sum(pilas.values())
+    # Peso de cada muestra = duración real repartida (el intervalo es aproximado)
+    peso = duracion / total if total else 0.0
+    return {
+        "$schema": "https://www.speedscope.app/file-format-schema.json",
+        "shared": {"frames": frames},
+        "profiles": [{
+            "type": "sampled",
+            "name": nombre,
+            "unit": "seconds",
+            "startValue": 0,
+            "endValue": duracion,
+            "samples": [[indices[f] for f in pila] for pila in pilas],
+            "weights": [n * peso for n in pilas.values()],
+        }],
+        "name": nombre,
+        "exporter": "iasights",
+    }
+
+
+# ==========================================================
+# Ejecución perfilada y almacenamiento
+# ==========================================================
+
+def _describir_argumentos(funcion, args, kwargs) -> dict:
+    """Parámetros de la llamada; los bytes (CSV subido) se resumen por tamaño."""
+    try:
+        ligados = inspect.signature(funcion).bind(*args, **kwargs).arguments
+    except (TypeError, ValueError):
+        ligados = {f"arg{i}": v for i, v in enumerate(args)} | kwargs
+
+    parametros, tamano, filas = {}, 0, 0
+    for nombre, valor in ligados.items():
+        if isinstance(valor, (bytes, bytearray)):
+            tamano += len(valor)
+            # Filas del CSV sin contar el encabezado
+            filas += max(valor.count(b"\n") - 1 + (not valor.endswith(b"\n")), 0)
+        else:
+            parametros[nombre] = valor if isinstance(valor, (int, float, str, bool, type(None))) else repr(valor)
+
+    return {"parametros": parametros, "tamano_bytes": tamano, "filas": filas}
+
+
+def _guardar(perfil_id: str, metadatos: dict, pilas: Counter, archivos: dict, cprofile) -> None:
+    os.makedirs(PERFILES_DIR, exist_ok=True)
+    base = os.path.join(PERFILES_DIR, perfil_id)
+
+    with open(base + ".collapsed", "w", encoding="utf-8") as f:
+        f.write(_collapsed(pilas))
+    with open(base + ".speedscope.json", "w", encoding="utf-8") as f:
+        json.dump(_speedscope(pilas, archivos, perfil_id, metadatos["duracion_s"]), f)
+    if cprofile is not None:
+        cprofile.dump_stats(base + ".prof")
+    # Los metadatos van al final: un perfil aparece en el listado ya completo
+    with open(base + ".json", "w", encoding="utf-8") as f:
+        json.dump(metadatos, f, ensure_ascii=False, indent=2)
+
+    _podar()
+
+
+def _podar() -> None:
+    perfiles = listar_perfiles(limite=None)
+    for meta in perfiles[MAX_PERFILES:]:
+        for extension, _ in FORMATOS_PERFIL.values():
+            try:
+                os.remove(os.path.join(PERFILES_DIR, meta["id"] + extension))
+            except FileNotFoundError:
+                pass
+
+
+def perfilar(solicitud: dict, endpoint: str, funcion, *args, **kwargs):
+    """
+    Ejecuta `funcion(*args, **kwargs)` en el hilo actual bajo el perfilador
+    pedido, guarda el perfil (también si la función falla) y devuelve su
+    resultado.
+    """
+    inicio = datetime.now(timezone.utc)
+    perfil_id = f"{inicio:%Y%m%dT%H%M%S}-{endpoint}-{secrets.token_hex(3)}"
+    solicitud["id"] = perfil_id
+
+    cprofile = None
+    if solicitud["modo"] == "completo" and _lock_cprofile.acquire(blocking=False):
+        import cProfile
+        cprofile = cProfile.Profile()
+
+    muestreador = _Muestreador(threading.get_ident(), sys._getframe(), INTERVALO_MUESTREO)
+    error = None
+    t0 = time.perf_counter()
+    muestreador.start()
+    try:
+        if cprofile is not None:
+            return cprofile.runcall(funcion, *args, **kwargs)
+        return funcion(*args, **kwargs)
+    except Exception as e:
+        error = repr(e)
+        raise
+    finally:
+        duracion = time.perf_counter() - t0
+        muestreador.detener()
+        if cprofile is not None:
+            _lock_cprofile.release()
+
+        metadatos = {
+            "id": perfil_id,
+            "endpoint": endpoint,
+            "fecha": inicio.isoformat(),
+            "pid": os.getpid(),
+            "modo": solicitud["modo"],
+            "duracion_s": round(duracion, 4),
+            "muestras": sum(muestreador.pilas.values()),
+            **solicitud["metadatos"],
+            **_describir_argumentos(funcion, args, kwargs),
+            "error": error,
+            "formatos": [f for f in FORMATOS_PERFIL if f != "prof" or cprofile is not None],
+        }
+        _guardar(perfil_id, metadatos, muestreador.pilas, muestreador.archivos, cprofile)
+
+
+def listar_perfiles(limite: int | None = 20) -> list:
+    """Metadatos de los perfiles guardados, del más reciente al más antiguo."""
+    if not os.path.isdir(PERFILES_DIR):
+        return []
+
+    perfiles = []
+    for archivo in os.listdir(PERFILES_DIR):
+        if not archivo.endswith(".json") or archivo.endswith(".speedscope.json"):
+            continue
+        try:
+            with open(os.path.join(PERFILES_DIR, archivo), encoding="utf-8") as f:
+                perfiles.append(json.load(f))
+        except (OSError, ValueError):
+            continue
+
+    perfiles.sort(key=lambda m: m.get("fecha", ""), reverse=True)
+    return perfiles if limite is None else perfiles[:limite]
+
+
+def ruta_perfil(perfil_id: str, formato: str) -> str | None:
+    """Ruta del archivo del perfil en el formato pedido, o None si no existe."""
+    if formato not in FORMATOS_PERFIL or not _ID_VALIDO.match(perfil_id):
+        return None
+    ruta = os.path.join(PERFILES_DIR, perfil_id + FORMATOS_PERFIL[formato][0])
+    return ruta if os.path.isfile(ruta) else None
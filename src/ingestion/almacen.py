@@ -0,0 +1,202 @@
+import os
+import uuid
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+from src.analytics.filtros import rango_periodo
+
+# ==========================================================
+# Almacenamiento en disco de datasets ingeridos
+# ==========================================================
+#
+# raiz/
+#   transacciones/mes=2025-01/<uuid>.parquet   ← detalle particionado por mes
+#   rollups/diario.parquet                     ← agregados materializados
+#   rollups/semanal.parquet
+#   rollups/mensual.parquet
+#
+# Los filtros de periodo resuelven el rango con el rollup diario (pocas filas)
+# y solo leen las particiones mensuales y columnas necesarias.
+
+_TRANSACCIONES = "transacciones"
+_ROLLUPS = "rollups"
+
+NIVELES_ROLLUP = {
+    "diario": None,
+    "semanal": "W-SUN",
+    "mensual": "M",
+}
+
+_COLUMNAS_ROLLUP = ["total_ventas", "cantidad_total", "n_lineas", "n_facturas"]
+
+
+def _ruta_rollup(raiz: str, nivel: str) -> str:
+    return os.path.join(raiz, _ROLLUPS, f"{nivel}.parquet")
+
+
+def _dataset_transacciones(raiz: str) -> ds.Dataset:
+    return ds.dataset(
+        os.path.join(raiz, _TRANSACCIONES),
+        format="parquet",
+        partitioning=ds.partitioning(pa.schema([("mes", pa.string())]), flavor="hive"),
+    )
+
+
+def _rollup_diario(df: pd.DataFrame) -> pd.DataFrame:
+    """Agregados por día: una factura pertenece a un solo día."""
+    return (
+        df.groupby("transaction_date", as_index=False)
+          .agg(
+              total_ventas=("product_subtotal", "sum"),
+              cantidad_total=("product_quantity", "sum"),
+              n_lineas=("invoice_id", "size"),
+              n_facturas=("invoice_id", "nunique"),
+          )
+          .sort_values("transaction_date")
+          .reset_index(drop=True)
+    )
+
+
+def _derivar_rollup(diario: pd.DataFrame, frecuencia: str) -> pd.DataFrame:
+    """Rollup semanal o mensual a partir del diario (todas las columnas son sumas)."""
+    periodo = diario["transaction_date"].dt.to_period(frecuencia).dt.start_time
+    return (
+        diario.groupby(periodo.rename("inicio_periodo"))[_COLUMNAS_ROLLUP]
+              .sum()
+              .reset_index()
+    )
+
+
+def guardar_dataset(df: pd.DataFrame, raiz: str) -> list:
+    """
+    Agrega transacciones validadas (salida de `cargar_csv`) al almacén.
+    Escribe una parte nueva por mes afectado y recalcula los rollups solo
+    para esos meses.
+
+    Returns:
+        lista de meses (YYYY-MM) actualizados.
+    """
+    df = df.copy()
+    df["transaction_date"] = pd.to_datetime(df["transaction_date"])
+    meses = df["transaction_date"].dt.to_period("M").astype(str)
+
+    for mes, parte in df.groupby(meses):
+        directorio = os.path.join(raiz, _TRANSACCIONES, f"mes={mes}")
+        os.makedirs(directorio, exist_ok=True)
+        parte.to_parquet(os.path.join(directorio, f"{uuid.uuid4().hex}.parquet"), index=False)
+
+    meses_afectados = sorted(meses.unique())
+
+    # Recalcular el rollup diario de los meses afectados (incluye partes previas)
+    columnas = ["transaction_date", "invoice_id", "product_quantity", "product_subtotal"]
+    nuevos = _rollup_diario(
+        _dataset_transacciones(raiz)
+        .to_table(columns=columnas, filter=ds.field("mes").isin(meses_afectados))
+        .to_pandas()
+    )
+
+    ruta_diario = _ruta_rollup(raiz, "diario")
+    if os.path.exists(ruta_diario):
+        previo = pd.read_parquet(ruta_diario)
+        previo = previo[~previo["transaction_date"].dt.to_period("M").astype(str).isin(meses_afectados)]
+        diario = pd.concat([previo, nuevos], ignore_index=True).sort_values("transaction_date")
+    else:
+        diario = nuevos
+
+    os.makedirs(os.path.join(raiz, _ROLLUPS), exist_ok=True)
+    diario.to_parquet(ruta_diario, index=False)
+    for nivel, frecuencia in NIVELES_ROLLUP.items():
+        if frecuencia is not None:
+            _derivar_rollup(diario, frecuencia).to_parquet(_ruta_rollup(raiz, nivel), index=False)
+
+    return meses_afectados
+
+
+def leer_rollup(raiz: str, nivel: str = "diario", periodo: str | None = None) -> pd.DataFrame:
+    """
+    Lee un rollup materializado. Con `periodo`, el rollup diario se recorta
+    al rango del periodo (mismas reglas que `filtrar_por_periodo`).
+    """
+    rollup = pd.read_parquet(_ruta_rollup(raiz, nivel))
+    if periodo is None:
+        return rollup
+    if nivel != "diario":
+        raise ValueError("El filtro por periodo solo aplica al rollup diario.")
+    inicio, fin = rango_periodo(rollup["transaction_date"], periodo)
+    return rollup[rollup["transaction_date"].between(inicio, fin)].reset_index(drop=True)
+
+
+def leer_periodo(raiz: str, periodo: str | None = None, columnas: list | None = None) -> pd.DataFrame:
+    """
+    Lee las transacciones del periodo tocando solo las particiones mensuales
+    que intersectan el rango y solo las columnas pedidas.
+    """
+    dataset = _dataset_transacciones(raiz)
+    if columnas is not None and "transaction_date" not in columnas:
+        columnas = list(columnas) + ["transaction_date"]
+
+    filtro = None
+    if periodo is not None:
+        meses, inicio, fin = _meses_periodo(raiz, periodo)
+        filtro = ds.field("mes").isin(meses) & _filtro_rango(inicio, fin)
+
+    df = dataset.to_table(columns=columnas, filter=filtro).to_pandas()
+    return df.drop(columns=["mes"], errors="ignore")
+
+
+def _meses_periodo(raiz: str, periodo: str) -> tuple:
+    """Rango del periodo (resuelto con el rollup diario) y meses que toca."""
+    diario = pd.read_parquet(_ruta_rollup(raiz, "diario"), columns=["transaction_date"])
+    inicio, fin = rango_periodo(diario["transaction_date"], periodo)
+    meses = pd.period_range(inicio, fin, freq="M").astype(str).tolist()
+    return meses, inicio, fin
+
+
+def _filtro_rango(inicio, fin) -> ds.Expression:
+    return (
+        (ds.field("transaction_date") >= pa.scalar(inicio, pa.timestamp("ns")))
+        & (ds.field("transaction_date") <= pa.scalar(fin, pa.timestamp("ns")))
+    )
+
+
+def iterar_meses(raiz: str, periodo: str | None = None, columnas: list | None = None):
+    """
+    Igual que `leer_periodo`, pero entrega un DataFrame por partición mensual
+    (en orden): la memoria depende del mes más grande, no del periodo completo.
+    Un día nunca se reparte entre dos lotes.
+    """
+    dataset = _dataset_transacciones(raiz)
+    if columnas is not None and "transaction_date" not in columnas:
+        columnas = list(columnas) + ["transaction_date"]
+
+    rango = None
+    if periodo is not None:
+        meses, inicio, fin = _meses_periodo(raiz, periodo)
+        rango = _filtro_rango(inicio, fin)
+    else:
+        meses = sorted(
+            nombre.split("=", 1)[1]
+            for nombre in os.listdir(os.path.join(raiz, _TRANSACCIONES))
+            if nombre.startswith("mes=")
+        )
+
+    for mes in meses:
+        filtro = ds.field("mes") == mes
+        if rango is not None:
+            filtro = filtro & rango
+        tabla = dataset.to_table(columns=columnas, filter=filtro)
+        if tabla.num_rows:
+            yield tabla.to_pandas().drop(columns=["mes"], errors="ignore")
+
+
+def ventas_diarias_almacen(raiz: str, periodo: str | None = None) -> pd.DataFrame:
+    """
+    Equivalente a `ventas_diarias` servido desde el rollup diario.
+
+    Columns:
+        transaction_date (datetime64[ns])
+        total_ventas (float)
+    """
+    return leer_rollup(raiz, "diario", periodo)[["transaction_date", "total_ventas"]]
@@ -0,0 +1,170 @@
+import json
+
+import numpy as np
+
+
+# ==========================================================
+# Formato compacto de inferencia para bosques de regresión
+# ==========================================================
+#
+# Un único archivo binario:
+#   [MAGIC (8 bytes)] [largo del encabezado (uint64)] [encabezado JSON]
+#   [padding] [feature] [threshold] [izquierdo] [derecho] [valor]
+#
+# Todos los árboles se concatenan en arreglos contiguos de nodos con índices
+# globales. Las hojas apuntan a sí mismas, de modo que el recorrido puede
+# avanzar `profundidad` pasos sin ramas especiales.
+
+MAGIC = b"IASBOSQ1"
+_ALINEACION = 64
+
+_ARREGLOS = {
+    "feature": np.int32,
+    "threshold": np.float64,
+    "izquierdo": np.int32,
+    "derecho": np.int32,
+    "valor": np.float64,
+}
+
+
+def aplanar_bosque(modelo) -> dict:
+    """
+    Convierte un RandomForestRegressor entrenado en arreglos NumPy contiguos.
+
+    Returns:
+        dict con:
+            - feature, threshold, izquierdo, derecho, valor: arreglos por nodo
+            - raices: índice del nodo raíz de cada árbol
+            - profundidad: profundidad máxima del bosque
+    """
+    partes = {nombre: [] for nombre in _ARREGLOS}
+    raices = []
+    offset = 0
+    profundidad = 0
+
+    for arbol in modelo.estimators_:
+        t = arbol.tree_
+        n = t.node_count
+        propios = np.arange(offset, offset + n)
+        es_hoja = t.children_left == -1
+
+        partes["feature"].append(np.where(es_hoja, 0, t.feature))
+        partes["threshold"].append(np.where(es_hoja, 0.0, t.threshold))
+        partes["izquierdo"].append(np.where(es_hoja, propios, t.children_left + offset))
+        partes["derecho"].append(np.where(es_hoja, propios, t.children_right + offset))
+        partes["valor"].append(t.value[:, 0, 0])
+
+        raices.append(offset)
+        offset += n
+        profundidad = max(profundidad, t.max_depth)
+
+    bosque = {
+        nombre: np.ascontiguousarray(np.concatenate(partes[nombre]), dtype=dtype)
+        for nombre, dtype in _ARREGLOS.items()
+    }
+    bosque["raices"] = np.asarray(raices, dtype=np.int32)
+    bosque["profundidad"] = int(profundidad)
+    return bosque
+
+
+def guardar_bosque_compacto(modelo, ruta: str, metadatos: dict | None = None) -> None:
+    """
+    Exporta el bosque a un único archivo mapeable en memoria.
+
+    Params:
+        modelo: RandomForestRegressor entrenado.
+        ruta: archivo de destino.
+        metadatos: dict serializable a JSON (features, fechas de referencia, etc.).
+    """
+    bosque = aplanar_bosque(modelo)
+
+    arreglos = {}
+    offset = 0
+    for nombre in _ARREGLOS:
+        arr = bosque[nombre]
+        arreglos[nombre] = {
+            "dtype": arr.dtype.str,
+            "shape": list(arr.shape),
+            "offset": offset,
+        }
+        offset += arr.nbytes
+        offset += -offset % _ALINEACION
+
+    encabezado = json.dumps({
+        "version": 1,
+        "n_arboles": int(len(bosque["raices"])),
+        "n_nodos": int(len(bosque["valor"])),
+        "n_features": int(modelo.n_features_in_),
+        "profundidad": bosque["profundidad"],
+        "raices": bosque["raices"].tolist(),
+        "arreglos": arreglos,
+        "metadatos": metadatos or {},
+    }).encode("utf-8")
+
+    inicio_datos = len(MAGIC) + 8 + len(encabezado)
+    inicio_datos += -inicio_datos % _ALINEACION
+
+    with open(ruta, "wb") as f:
+        f.write(MAGIC)
+        f.write(np.uint64(len(encabezado)).tobytes())
+        f.write(encabezado)
+        f.write(b"\0" * (inicio_datos - f.tell()))
+        for nombre in _ARREGLOS:
+            f.write(b"\0" * (inicio_datos + arreglos[nombre]["offset"] - f.tell()))
+            bosque[nombre].tofile(f)
+
+
+def cargar_bosque_compacto(ruta: str) -> dict:
+    """
+    Carga un bosque exportado como arreglos de solo lectura mapeados en memoria.
+    No copia los nodos: varios procesos que cargan el mismo archivo comparten
+    las páginas del sistema operativo.
+    """
+    with open(ruta, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"Archivo de modelo inválido: {ruta}")
+        largo = int(np.frombuffer(f.read(8), dtype=np.uint64)[0])
+        encabezado = json.loads(f.read(largo).decode("utf-8"))
+
+    inicio_datos = len(MAGIC) + 8 + largo
+    inicio_datos += -inicio_datos % _ALINEACION
+
+    bosque = {
+        nombre: np.memmap(
+            ruta,
+            dtype=np.dtype(info["dtype"]),
+            mode="r",
+            offset=inicio_datos + info["offset"],
+            shape=tuple(info["shape"]),
+        )
+        for nombre, info in encabezado["arreglos"].items()
+    }
+    bosque["raices"] = np.asarray(encabezado["raices"], dtype=np.int32)
+    bosque["profundidad"] = encabezado["profundidad"]
+    bosque["n_features"] = encabezado["n_features"]
+    bosque["metadatos"] = encabezado["metadatos"]
+    return bosque
+
+
+def predecir_por_arbol(bosque: dict, X) -> np.ndarray:
+    """
+    Evalúa todos los árboles para todas las filas de X a la vez (NumPy puro).
+
+    Returns:
+        np.ndarray (n_arboles, n_muestras) con la predicción de cada árbol.
+    """
+    # Misma comparación que sklearn: X en float32 contra umbrales en float64
+    X = np.asarray(X, dtype=np.float32)
+    filas = np.arange(X.shape[0])[:, None]
+    nodos = np.broadcast_to(bosque["raices"], (X.shape[0], len(bosque["raices"])))
+
+    for _ in range(bosque["profundidad"]):
+        ir_izquierda = X[filas, bosque["feature"][nodos]] <= bosque["threshold"][nodos]
+        nodos = np.where(ir_izquierda, bosque["izquierdo"][nodos], bosque["derecho"][nodos])
+
+    return np.asarray(bosque["valor"][nodos]).T
+
+
+def predecir(bosque: dict, X) -> np.ndarray:
+    """Predicción del bosque: promedio de los árboles, igual que sklearn."""
+    return predecir_por_arbol(bosque, X).mean(axis=0)
@@ -1,6 +1,10 @@
+import copy
+
+import numpy as np
 import pandas as pd
-from sklearn.ensemble import RandomForestRegressor
-from sklearn.model_selection import train_test_split
+
+from src.ml.bosque_compacto import guardar_bosque_compacto, predecir_por_arbol
+from src.utils.cpu import reservar_cpu
 
 
 def _construir_dataset_diario(df: pd.DataFrame) -> pd.DataFrame:
@@ -22,20 +26,87 @@ def _construir_dataset_diario(df: pd.DataFrame) -> pd.DataFrame:
 
     # Features temporales
     fecha_min = diario["transaction_date"].min()
-    diario["dia_semana"] = diario["transaction_date"].dt.dayofweek        # 0=Lunes
-    diario["es_fin_semana"] = diario["dia_semana"].isin([5, 6]).astype(int)
-    diario["semana_mes"] = (diario["transaction_date"].dt.day - 1) // 7 + 1
-    diario["dia_mes"] = diario["transaction_date"].dt.day
-    diario["dia_ordinal"] = (diario["transaction_date"] - fecha_min).dt.days
+    return _agregar_features_temporales(diario, fecha_min)
+
+
+def _agregar_features_temporales(df: pd.DataFrame, fecha_min: pd.Timestamp) -> pd.DataFrame:
+    """
+    Añade las features temporales del modelo a un DataFrame con
+    `transaction_date`. `fecha_min` es la fecha de referencia de `dia_ordinal`.
+    """
+    df["dia_semana"] = df["transaction_date"].dt.dayofweek        # 0=Lunes
+    df["es_fin_semana"] = df["dia_semana"].isin([5, 6]).astype(int)
+    df["semana_mes"] = (df["transaction_date"].dt.day - 1) // 7 + 1
+    df["dia_mes"] = df["transaction_date"].dt.day
+    df["dia_ordinal"] = (df["transaction_date"] - fecha_min).dt.days
+    return df
+
+
+def _fechas_futuras(ultima_fecha: pd.Timestamp, dias_futuro: int) -> pd.DatetimeIndex:
+    return pd.date_range(
+        start=ultima_fecha + pd.Timedelta(days=1),
+        periods=dias_futuro,
+        freq="D"
+    )
+
+
+FEATURES = ["dia_semana", "es_fin_semana", "semana_mes", "dia_mes", "dia_ordinal"]
+
+# Cuantiles usados por defecto para las bandas de predicción (p10/p50/p90)
+CUANTILES_INTERVALO = (0.1, 0.5, 0.9)
+
+
+def _predicciones_por_arbol(modelo, X: pd.DataFrame) -> np.ndarray:
+    """
+    Devuelve una matriz (n_arboles, n_muestras) con la predicción de cada árbol.
+    Se valida X una sola vez y se evita la validación por árbol, igual que
+    hace internamente `RandomForestRegressor.predict`.
+    """
+    X_arr = np.ascontiguousarray(X.to_numpy(dtype=np.float32))
+    return np.stack(
+        [arbol.predict(X_arr, check_input=False) for arbol in modelo.estimators_]
+    )
+
+
+def _columna_cuantil(q: float) -> str:
+    """Ej: 0.1 -> "p10", 0.5 -> "p50"."""
+    return f"p{round(q * 100):g}"
+
 
-    return diario
+def _predecir_futuro(
+    modelo,
+    ultima_fecha: pd.Timestamp,
+    fecha_min: pd.Timestamp,
+    dias_futuro: int,
+    cuantiles: tuple | None
+) -> pd.DataFrame:
+    """Predicciones de los `dias_futuro` días siguientes a `ultima_fecha`."""
+    df_futuro = pd.DataFrame({"transaction_date": _fechas_futuras(ultima_fecha, dias_futuro)})
+    df_futuro = _agregar_features_temporales(df_futuro, fecha_min)
+
+    X_future = df_futuro[FEATURES]
+    columnas_bandas = []
+    if cuantiles:
+        # Una sola matriz árboles × días: la media es la predicción del bosque
+        # y los cuantiles por columna forman las bandas.
+        por_arbol = _predicciones_por_arbol(modelo, X_future)
+        df_futuro["prediccion"] = por_arbol.mean(axis=0)
+        bandas = np.quantile(por_arbol, cuantiles, axis=0)
+        for q, banda in zip(cuantiles, bandas):
+            df_futuro[_columna_cuantil(q)] = banda
+            columnas_bandas.append(_columna_cuantil(q))
+    else:
+        df_futuro["prediccion"] = modelo.predict(X_future)
+
+    return df_futuro[["transaction_date", "prediccion"] + columnas_bandas]
 
 
 def entrenar_y_predecir_ventas_diarias(
     df_filtrado: pd.DataFrame,
     dias_futuro: int = 7,
     test_size: float = 0.2,
-    random_state: int = 42
+    random_state: int = 42,
+    cuantiles: tuple | None = None
 ) -> dict:
     """
     Entrena un modelo de regresión para ventas diarias sobre el periodo filtrado
@@ -46,15 +117,26 @@ def entrenar_y_predecir_ventas_diarias(
         dias_futuro: número de días futuros a predecir.
         test_size: proporción de datos para evaluación interna.
         random_state: semilla para reproducibilidad.
+        cuantiles: cuantiles opcionales (ej: CUANTILES_INTERVALO) para devolver
+            bandas de predicción a partir de la distribución de los árboles.
 
     Returns:
         dict con:
             - historico: DataFrame con columnas
                 [transaction_date, ventas_totales, prediccion (opcional)]
             - predicciones_futuras: DataFrame con columnas
-                [transaction_date, prediccion]
+                [transaction_date, prediccion, p10, p50, p90 (si cuantiles)]
             - metricas_modelo: dict con r2_test, n_dias_hist
+            - modelo: RandomForestRegressor final (None si no se entrenó)
+            - entrenamiento: estado para `actualizar_modelo_ventas`
+                (fecha_min, ultimo_completo, mae_test, actualizaciones)
     """
+    # sklearn se importa aquí para que servir modelos exportados
+    # (`predecir_con_modelo_exportado`) no requiera cargarlo.
+    from sklearn.ensemble import RandomForestRegressor
+    from sklearn.metrics import mean_absolute_error, r2_score
+    from sklearn.model_selection import train_test_split
+
     diario = _construir_dataset_diario(df_filtrado)
 
     n_dias = len(diario)
@@ -63,6 +145,7 @@ def entrenar_y_predecir_ventas_diarias(
         return {
             "historico": diario,
             "predicciones_futuras": pd.DataFrame(),
+            "modelo": None,
             "metricas_modelo": {
                 "r2_test": None,
                 "n_dias_hist": int(n_dias),
@@ -71,7 +154,7 @@ def entrenar_y_predecir_ventas_diarias(
         }
 
     # Features y target
-    features = ["dia_semana", "es_fin_semana", "semana_mes", "dia_mes", "dia_ordinal"]
+    features = FEATURES
     target = "ventas_totales"
 
     X = diario[features]
@@ -82,44 +165,32 @@ def entrenar_y_predecir_ventas_diarias(
         X, y, test_size=test_size, shuffle=False
     )
 
-    modelo = RandomForestRegressor(
-        n_estimators=200,
-        random_state=random_state,
-        n_jobs=-1
-    )
-    modelo.fit(X_train, y_train)
+    # Hilos del presupuesto global de CPU (no todos los núcleos por petición)
+    with reservar_cpu(etiqueta="random_forest") as n_jobs:
+        modelo = RandomForestRegressor(
+            n_estimators=200,
+            random_state=random_state,
+            n_jobs=n_jobs
+        )
+        modelo.fit(X_train, y_train)
 
-    r2_test = modelo.score(X_test, y_test)
+        pred_test = modelo.predict(X_test)
+        r2_test = r2_score(y_test, pred_test)
+        mae_test = mean_absolute_error(y_test, pred_test)
 
-    # Reentrenar en todo el histórico para predicción final
-    modelo.fit(X, y)
+        # Reentrenar en todo el histórico para predicción final
+        modelo.fit(X, y)
 
-    # Predicción en histórico (opcional, útil para gráficos comparativos)
-    diario["prediccion"] = modelo.predict(X)
+        # Predicción en histórico (opcional, útil para gráficos comparativos)
+        diario["prediccion"] = modelo.predict(X)
 
     # Predicciones futuras
     ultima_fecha = diario["transaction_date"].max()
     fecha_min = diario["transaction_date"].min()
-
-    fechas_futuras = pd.date_range(
-        start=ultima_fecha + pd.Timedelta(days=1),
-        periods=dias_futuro,
-        freq="D"
-    )
-
-    df_futuro = pd.DataFrame({"transaction_date": fechas_futuras})
-    df_futuro["dia_semana"] = df_futuro["transaction_date"].dt.dayofweek
-    df_futuro["es_fin_semana"] = df_futuro["dia_semana"].isin([5, 6]).astype(int)
-    df_futuro["semana_mes"] = (df_futuro["transaction_date"].dt.day - 1) // 7 + 1
-    df_futuro["dia_mes"] = df_futuro["transaction_date"].dt.day
-    df_futuro["dia_ordinal"] = (df_futuro["transaction_date"] - fecha_min).dt.days
-
-    X_future = df_futuro[features]
-    df_futuro["prediccion"] = modelo.predict(X_future)
+    predicciones_futuras = _predecir_futuro(modelo, ultima_fecha, fecha_min, dias_futuro, cuantiles)
 
     # Ordenar columnas para claridad
     historico = diario[["transaction_date", "ventas_totales", "prediccion"]]
-    predicciones_futuras = df_futuro[["transaction_date", "prediccion"]]
 
     metricas = {
         "r2_test": float(r2_test),
@@ -130,5 +201,227 @@ def entrenar_y_predecir_ventas_diarias(
     return {
         "historico": historico,
         "predicciones_futuras": predicciones_futuras,
-        "metricas_modelo": metricas
-    }
\ No newline at end of file
+        "metricas_modelo": metricas,
+        "modelo": modelo,
+        "entrenamiento": {
+            "fecha_min": fecha_min,
+            "ultimo_completo": ultima_fecha,
+            "mae_test": float(mae_test),
+            "actualizaciones": 0,
+        }
+    }
+
+
+# Actualización incremental: se reemplaza una fracción de los árboles más
+# antiguos por árboles nuevos entrenados sobre una ventana reciente
+# (warm_start), en lugar de reentrenar los 200 árboles sobre todo el histórico.
+FRACCION_REEMPLAZO = 0.25
+VENTANA_RECIENTE_DIAS = 120
+
+# Reentrenamiento completo si el error en los días nuevos supera
+# UMBRAL_DERIVA × el MAE de validación, o cada REENTRENAR_CADA_DIAS días.
+UMBRAL_DERIVA = 2.0
+REENTRENAR_CADA_DIAS = 30
+
+
+def actualizar_modelo_ventas(
+    resultados: dict,
+    df_nuevo: pd.DataFrame,
+    dias_futuro: int = 7,
+    fraccion_reemplazo: float = FRACCION_REEMPLAZO,
+    ventana_dias: int = VENTANA_RECIENTE_DIAS,
+    umbral_deriva: float = UMBRAL_DERIVA,
+    reentrenar_cada_dias: int = REENTRENAR_CADA_DIAS,
+    cuantiles: tuple | None = None,
+    random_state: int = 42
+) -> dict:
+    """
+    Refresca un modelo de `entrenar_y_predecir_ventas_diarias` con las
+    transacciones de días nuevos.
+
+    Antes de actualizar, el modelo vigente predice los días nuevos: ese error
+    fuera de muestra decide si hay deriva. Con deriva, sin modelo previo o
+    cumplido el calendario se reentrena todo; si no, se descartan los árboles
+    más antiguos y se entrenan otros tantos sobre los últimos `ventana_dias`.
+
+    Params:
+        resultados: salida previa (de entrenamiento o de esta función).
+        df_nuevo: transacciones nuevas (solo cuentan las fechas posteriores
+            al histórico).
+
+    Returns:
+        dict con el mismo formato que `entrenar_y_predecir_ventas_diarias`;
+        metricas_modelo incluye modo ("incremental" | "completo" | "sin_cambios")
+        y motivo.
+    """
+    from sklearn.metrics import mean_absolute_error, r2_score
+
+    historico = resultados["historico"]
+    ultima_fecha = historico["transaction_date"].max()
+
+    nuevo = df_nuevo.assign(transaction_date=pd.to_datetime(df_nuevo["transaction_date"]))
+    nuevo = nuevo[nuevo["transaction_date"] > ultima_fecha]
+    if nuevo.empty:
+        metricas = dict(resultados["metricas_modelo"], modo="sin_cambios", motivo="sin días nuevos")
+        sin_cambios = dict(resultados, metricas_modelo=metricas)
+        if resultados.get("modelo") is not None:
+            sin_cambios["predicciones_futuras"] = _predecir_futuro(
+                resultados["modelo"], ultima_fecha, resultados["entrenamiento"]["fecha_min"],
+                dias_futuro, cuantiles
+            )
+        return sin_cambios
+
+    diario_nuevo = (
+        nuevo.groupby("transaction_date", as_index=False)
+             .agg(ventas_totales=("product_subtotal", "sum"))
+             .sort_values("transaction_date")
+    )
+    combinado = pd.concat(
+        [historico[["transaction_date", "ventas_totales"]], diario_nuevo], ignore_index=True
+    )
+
+    modelo = resultados.get("modelo")
+    estado = resultados.get("entrenamiento")
+
+    # ---------------------------------------------------------------
+    # ¿Reentrenamiento completo?
+    # ---------------------------------------------------------------
+    motivo = None
+    if modelo is None or estado is None:
+        motivo = "sin modelo previo"
+    else:
+        diario_nuevo = _agregar_features_temporales(diario_nuevo, estado["fecha_min"])
+        pred_nuevos = modelo.predict(diario_nuevo[FEATURES])
+        mae_nuevos = mean_absolute_error(diario_nuevo["ventas_totales"], pred_nuevos)
+        dias_desde_completo = (diario_nuevo["transaction_date"].max() - estado["ultimo_completo"]).days
+
+        if mae_nuevos > umbral_deriva * estado["mae_test"]:
+            motivo = f"deriva (MAE días nuevos {mae_nuevos:,.2f} vs. {estado['mae_test']:,.2f})"
+        elif dias_desde_completo >= reentrenar_cada_dias:
+            motivo = f"calendario ({dias_desde_completo} días desde el último completo)"
+
+    if motivo is not None:
+        # El modelo agrega por día: el diario combinado sirve como entrada
+        completo = entrenar_y_predecir_ventas_diarias(
+            combinado.rename(columns={"ventas_totales": "product_subtotal"}),
+            dias_futuro,
+            random_state=random_state,
+            cuantiles=cuantiles
+        )
+        completo["metricas_modelo"].update(modo="completo", motivo=motivo)
+        return completo
+
+    # ---------------------------------------------------------------
+    # Actualización incremental con warm_start
+    # ---------------------------------------------------------------
+    combinado = _agregar_features_temporales(combinado, estado["fecha_min"])
+    reciente = combinado[
+        combinado["transaction_date"] > combinado["transaction_date"].max() - pd.Timedelta(days=ventana_dias)
+    ]
+
+    # Copia superficial: el modelo de `resultados` no se modifica
+    modelo = copy.copy(modelo)
+    n_arboles = len(modelo.estimators_)
+    n_reemplazo = max(1, int(round(fraccion_reemplazo * n_arboles)))
+    actualizaciones = estado["actualizaciones"] + 1
+
+    with reservar_cpu(etiqueta="random_forest") as n_jobs:
+        modelo.estimators_ = modelo.estimators_[n_reemplazo:]
+        # Semilla distinta en cada actualización para que los árboles nuevos
+        # no repitan el muestreo bootstrap de los que sobrevivieron.
+        modelo.set_params(
+            warm_start=True,
+            n_estimators=n_arboles,
+            random_state=random_state + actualizaciones,
+            n_jobs=n_jobs
+        )
+        modelo.fit(reciente[FEATURES], reciente["ventas_totales"])
+        combinado["prediccion"] = modelo.predict(combinado[FEATURES])
+
+    nuevo_ultima_fecha = combinado["transaction_date"].max()
+    metricas = {
+        # r2 de los días nuevos con el modelo anterior (fuera de muestra)
+        "r2_test": float(r2_score(diario_nuevo["ventas_totales"], pred_nuevos))
+        if len(diario_nuevo) >= 2 else resultados["metricas_modelo"].get("r2_test"),
+        "n_dias_hist": int(len(combinado)),
+        "mensaje": "Modelo actualizado correctamente.",
+        "modo": "incremental",
+        "motivo": f"{n_reemplazo} árboles reemplazados con los últimos {len(reciente)} días",
+    }
+
+    return {
+        "historico": combinado[["transaction_date", "ventas_totales", "prediccion"]],
+        "predicciones_futuras": _predecir_futuro(
+            modelo, nuevo_ultima_fecha, estado["fecha_min"], dias_futuro, cuantiles
+        ),
+        "metricas_modelo": metricas,
+        "modelo": modelo,
+        "entrenamiento": dict(estado, actualizaciones=actualizaciones),
+    }
+
+
+def exportar_modelo_ventas(resultados: dict, ruta: str) -> None:
+    """
+    Exporta el modelo devuelto por `entrenar_y_predecir_ventas_diarias` al
+    formato compacto de inferencia (ver `src.ml.bosque_compacto`), junto con
+    las fechas necesarias para reconstruir las features de días futuros.
+    """
+    historico = resultados["historico"]
+    metadatos = {
+        "features": FEATURES,
+        "fecha_min": historico["transaction_date"].min().date().isoformat(),
+        "ultima_fecha": historico["transaction_date"].max().date().isoformat(),
+        "metricas_modelo": resultados["metricas_modelo"],
+    }
+    guardar_bosque_compacto(resultados["modelo"], ruta, metadatos)
+
+
+def predecir_con_modelo_exportado(
+    bosque: dict,
+    dias_futuro: int = 7,
+    cuantiles: tuple | None = None
+) -> pd.DataFrame:
+    """
+    Genera predicciones futuras desde un bosque cargado con
+    `cargar_bosque_compacto`, sin sklearn ni reentrenamiento.
+
+    Returns:
+        DataFrame con columnas [transaction_date, prediccion, p10, p50, p90 (si cuantiles)]
+    """
+    meta = bosque["metadatos"]
+    fecha_min = pd.Timestamp(meta["fecha_min"])
+    ultima_fecha = pd.Timestamp(meta["ultima_fecha"])
+
+    df_futuro = pd.DataFrame({"transaction_date": _fechas_futuras(ultima_fecha, dias_futuro)})
+    df_futuro = _agregar_features_temporales(df_futuro, fecha_min)
+
+    por_arbol = predecir_por_arbol(bosque, df_futuro[meta["features"]].to_numpy())
+    df_futuro["prediccion"] = por_arbol.mean(axis=0)
+
+    columnas_bandas = []
+    if cuantiles:
+        bandas = np.quantile(por_arbol, cuantiles, axis=0)
+        for q, banda in zip(cuantiles, bandas):
+            df_futuro[_columna_cuantil(q)] = banda
+            columnas_bandas.append(_columna_cuantil(q))
+
+    return df_futuro[["transaction_date", "prediccion"] + columnas_bandas]
+
+
+def lotes_prediccion(resultados: dict, tamano_lote: int = 5000):
+    """
+    Histórico y predicciones futuras de `entrenar_y_predecir_ventas_diarias`
+    como lotes de filas con el mismo esquema, para exportación.
+
+    Columns:
+        tipo ("historico" | "prediccion"), transaction_date, ventas_totales,
+        prediccion, p10/p50/p90 (si se pidieron cuantiles)
+    """
+    futuras = resultados["predicciones_futuras"]
+    columnas = ["tipo", "transaction_date", "ventas_totales"] + [
+        c for c in futuras.columns if c != "transaction_date"
+    ]
+    for tipo, tabla in [("historico", resultados["historico"]), ("prediccion", futuras)]:
+        for inicio in range(0, len(tabla), tamano_lote):
+            lote = tabla.iloc[inicio:inicio + tamano_lote].assign(tipo=tipo)
+            yield lote.reindex(columns=columnas)
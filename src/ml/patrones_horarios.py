@@ -1,9 +1,9 @@
 import pandas as pd
-from sklearn.cluster import KMeans
-from sklearn.preprocessing import StandardScaler
 
+from src.utils.cpu import reservar_cpu
 
-_DIAS = {
+
+DIAS = {
     0: "Lunes",
     1: "Martes",
     2: "Miércoles",
@@ -14,7 +14,7 @@ _DIAS = {
 }
 
 
-def _bucket_hora(hora: int, ancho: int = 3) -> str:
+def bucket_hora(hora: int, ancho: int = 3) -> str:
     """
     Agrupa la hora en franjas de `ancho` horas.
     Ej: 8 -> "06:00-09:00" si ancho=3.
@@ -74,10 +74,10 @@ def detectar_patrones_horarios(df: pd.DataFrame) -> pd.DataFrame:
 
     # Día de la semana (0=lun, 6=dom)
     df_work["dia_idx"] = df_work["transaction_date"].dt.dayofweek
-    df_work["Día"] = df_work["dia_idx"].map(_DIAS)
+    df_work["Día"] = df_work["dia_idx"].map(DIAS)
 
     # Franja horaria definida por tus buckets
-    df_work["Franja horaria"] = df_work["hora"].apply(_bucket_hora)
+    df_work["Franja horaria"] = df_work["hora"].apply(bucket_hora)
 
     # ================================================================
     # Agregación por día y franja
@@ -113,12 +113,17 @@ def detectar_patrones_horarios(df: pd.DataFrame) -> pd.DataFrame:
     # ================================================================
     n_grupos = len(agg)
     if n_grupos >= 3:
+        # Import diferido: sklearn solo se carga si hay suficientes grupos
+        from sklearn.cluster import KMeans
+        from sklearn.preprocessing import StandardScaler
+
         features = agg[["Ventas totales", "No. de transacciones"]].values
         scaler = StandardScaler()
         X = scaler.fit_transform(features)
 
         kmeans = KMeans(n_clusters=3, random_state=42, n_init="auto")
-        agg["cluster"] = kmeans.fit_predict(X)
+        with reservar_cpu(etiqueta="kmeans"):
+            agg["cluster"] = kmeans.fit_predict(X)
 
         orden = (
             agg.groupby("cluster")["Ventas totales"]
@@ -166,4 +171,16 @@ def detectar_patrones_horarios(df: pd.DataFrame) -> pd.DataFrame:
             "No. de transacciones",
             "Nivel de demanda",
         ]
-    ]
\ No newline at end of file
+    ]
+
+def lotes_patrones_horarios(chunks):
+    """
+    Tabla de patrones por cada lote de transacciones (ej: una partición
+    mensual del almacén), con la columna "Mes" al frente. Permite exportar
+    años completos sin juntar todas las transacciones en memoria.
+    """
+    for chunk in chunks:
+        tabla = detectar_patrones_horarios(chunk)
+        mes = pd.to_datetime(chunk["transaction_date"]).min().strftime("%Y-%m")
+        tabla.insert(0, "Mes", mes)
+        yield tabla
@@ -0,0 +1,164 @@
+import numpy as np
+import pandas as pd
+
+from src.ml.patrones_horarios import DIAS
+from src.utils.cpu import reservar_cpu
+
+# ==========================================================
+# Pronóstico de ventas por hora (próxima semana)
+# ==========================================================
+#
+# Las transacciones se agregan en una matriz densa fecha × hora (24
+# columnas; horas sin ventas = 0). Un único modelo Ridge se ajusta sobre todas
+# las celdas a la vez con indicadores de hora, de día de la semana y de la
+# interacción día × hora, más una tendencia. La penalización (shrinkage)
+# acerca cada celda día × hora a lo que explican la hora y el día por separado
+# cuando hay pocas semanas de historia. Las semanas recientes pesan más
+# (semivida configurable).
+
+N_HORAS = 24
+N_COLUMNAS = 7 * N_HORAS + N_HORAS + 7 + 1   # interacción + hora + día + tendencia
+
+MIN_DIAS_HORARIO = 14
+
+
+def matriz_horaria(df: pd.DataFrame) -> tuple:
+    """
+    Ventas por fecha y hora del día.
+
+    Returns:
+        (fechas: DatetimeIndex continuo, matriz: ndarray (n_dias, 24))
+    """
+    fechas = pd.to_datetime(df["transaction_date"], errors="coerce").dt.normalize()
+    horas = pd.to_datetime(
+        df["transaction_time"].astype(str), format="%H:%M:%S", errors="coerce"
+    ).dt.hour
+    subtotal = pd.to_numeric(df["product_subtotal"], errors="coerce").fillna(0)
+
+    validos = (fechas.notna() & horas.notna()).to_numpy()
+    if not validos.any():
+        return pd.DatetimeIndex([]), np.zeros((0, N_HORAS))
+
+    fechas, horas, subtotal = fechas[validos], horas[validos], subtotal[validos]
+    fecha_min = fechas.min()
+    n_dias = (fechas.max() - fecha_min).days + 1
+
+    celda = (fechas - fecha_min).dt.days.to_numpy() * N_HORAS + horas.to_numpy().astype(np.int64)
+    matriz = np.bincount(celda, weights=subtotal.to_numpy(), minlength=n_dias * N_HORAS)
+    return pd.date_range(fecha_min, periods=n_dias, freq="D"), matriz.reshape(n_dias, N_HORAS)
+
+
+def _diseno(fechas: pd.DatetimeIndex, fecha_min: pd.Timestamp) -> np.ndarray:
+    """
+    Matriz de diseño de todas las celdas (n_dias * 24, N_COLUMNAS), en el
+    mismo orden que `matriz.ravel()`.
+    """
+    n = len(fechas) * N_HORAS
+    dia_semana = np.repeat(fechas.dayofweek.to_numpy(), N_HORAS)
+    hora = np.tile(np.arange(N_HORAS), len(fechas))
+    filas = np.arange(n)
+
+    X = np.zeros((n, N_COLUMNAS))
+    X[filas, dia_semana * N_HORAS + hora] = 1.0
+    X[filas, 7 * N_HORAS + hora] = 1.0
+    X[filas, 7 * N_HORAS + N_HORAS + dia_semana] = 1.0
+    # Tendencia en años desde el inicio del histórico
+    X[:, -1] = np.repeat((fechas - fecha_min).days.to_numpy() / 365.0, N_HORAS)
+    return X
+
+
+def _pesos(n_dias: int, semivida_dias: float | None) -> np.ndarray:
+    if not semivida_dias:
+        return np.ones(n_dias * N_HORAS)
+    antiguedad = np.arange(n_dias)[::-1]
+    return np.repeat(0.5 ** (antiguedad / semivida_dias), N_HORAS)
+
+
+def _ajustar(X, y, pesos, alpha):
+    from sklearn.linear_model import Ridge
+
+    modelo = Ridge(alpha=alpha)
+    # El ajuste es álgebra lineal densa (BLAS): sus hilos salen del presupuesto
+    with reservar_cpu(etiqueta="ridge_horario", blas=True):
+        modelo.fit(X, y, sample_weight=pesos)
+    return modelo
+
+
+def pronosticar_ventas_horarias(
+    df: pd.DataFrame,
+    dias_futuro: int = 7,
+    alpha: float = 1.0,
+    semivida_dias: float | None = 56
+) -> dict:
+    """
+    Pronostica ventas por hora para los `dias_futuro` días siguientes al
+    último día del histórico.
+
+    Params:
+        alpha: penalización Ridge (mayor = celdas más parecidas a hora + día).
+        semivida_dias: días tras los cuales una observación pesa la mitad
+            (None = todas pesan igual).
+
+    Returns:
+        dict con:
+            - grilla: DataFrame (dias_futuro × 24) indexado por fecha, con la
+                columna "Día" y una columna por hora (0–23)
+            - detalle: DataFrame [transaction_date, Día, hora, prediccion]
+            - metricas_modelo: dict con mae_validacion, wape_validacion
+                (última semana reservada), n_dias_hist y mensaje
+    """
+    fechas, matriz = matriz_horaria(df)
+    n_dias = len(fechas)
+    if n_dias < MIN_DIAS_HORARIO:
+        return {
+            "grilla": pd.DataFrame(),
+            "detalle": pd.DataFrame(),
+            "metricas_modelo": {
+                "mae_validacion": None,
+                "wape_validacion": None,
+                "n_dias_hist": int(n_dias),
+                "mensaje": f"Datos insuficientes para el pronóstico horario (se requieren ≥ {MIN_DIAS_HORARIO} días).",
+            },
+        }
+
+    fecha_min = fechas[0]
+    X = _diseno(fechas, fecha_min)
+    y = matriz.ravel()
+    pesos = _pesos(n_dias, semivida_dias)
+
+    # Validación: se reserva la última semana
+    corte = (n_dias - 7) * N_HORAS
+    validacion = _ajustar(X[:corte], y[:corte], pesos[:corte], alpha)
+    pred_val = np.clip(validacion.predict(X[corte:]), 0, None)
+    error = np.abs(pred_val - y[corte:])
+    total_real = y[corte:].sum()
+
+    # Ajuste final con todo el histórico
+    modelo = _ajustar(X, y, pesos, alpha)
+
+    fechas_futuras = pd.date_range(fechas[-1] + pd.Timedelta(days=1), periods=dias_futuro, freq="D")
+    prediccion = np.clip(modelo.predict(_diseno(fechas_futuras, fecha_min)), 0, None)
+    prediccion = prediccion.reshape(dias_futuro, N_HORAS)
+    # Horas sin ninguna venta en el histórico (local cerrado) → 0
+    prediccion[:, matriz.sum(axis=0) == 0] = 0.0
+
+    grilla = pd.DataFrame(prediccion, index=fechas_futuras.rename("transaction_date"), columns=range(N_HORAS))
+    grilla.insert(0, "Día", fechas_futuras.dayofweek.map(DIAS))
+
+    detalle = pd.DataFrame({
+        "transaction_date": np.repeat(fechas_futuras, N_HORAS),
+        "Día": np.repeat(fechas_futuras.dayofweek.map(DIAS), N_HORAS),
+        "hora": np.tile(np.arange(N_HORAS), dias_futuro),
+        "prediccion": prediccion.ravel(),
+    })
+
+    return {
+        "grilla": grilla,
+        "detalle": detalle,
+        "metricas_modelo": {
+            "mae_validacion": float(error.mean()),
+            "wape_validacion": float(error.sum() / total_real) if total_real else None,
+            "n_dias_hist": int(n_dias),
+            "mensaje": "Modelo horario entrenado correctamente.",
+        },
+    }
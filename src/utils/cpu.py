@@ -0,0 +1,127 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from threadpoolctl import threadpool_limits
+
+# ==========================================================
+# Presupuesto global de CPU del proceso
+# ==========================================================
+#
+# El entrenamiento del bosque, el clustering y cualquier otro trabajo paralelo
+# piden "slots" (hilos) a un presupuesto fijo por proceso en lugar de usar
+# todos los núcleos (n_jobs=-1) cada uno. Si no quedan slots libres, la
+# reserva recibe los que haya (mínimo `minimo`) o espera en cola hasta que se
+# liberen. Así varias peticiones concurrentes no sobre-suscriben la máquina.
+#
+# Presupuesto: IASIGHTS_CPU_BUDGET o, por defecto, os.cpu_count(). Con varios
+# workers de uvicorn conviene repartir los núcleos: cpu_count / workers.
+
+_condicion = threading.Condition()
+_estado = {"en_uso": 0, "esperando": 0, "en_uso_blas": 0}
+_metricas = {}
+
+
+def presupuesto_cpu() -> int:
+    """Slots totales del proceso."""
+    valor = os.environ.get("IASIGHTS_CPU_BUDGET")
+    return max(int(valor), 1) if valor else (os.cpu_count() or 1)
+
+
+def _registrar(etiqueta: str, solicitados: int, concedidos: int, espera_s: float) -> None:
+    m = _metricas.setdefault(etiqueta, {
+        "reservas": 0,
+        "slots_concedidos": 0,
+        "reducidas": 0,
+        "espera_total_s": 0.0,
+        "espera_max_s": 0.0,
+    })
+    m["reservas"] += 1
+    m["slots_concedidos"] += concedidos
+    m["reducidas"] += concedidos < solicitados
+    m["espera_total_s"] += espera_s
+    m["espera_max_s"] = max(m["espera_max_s"], espera_s)
+
+
+def _aplicar_limite_blas() -> None:
+    """
+    Límite global de BLAS = hilos reservados por trabajos BLAS en curso (1 si
+    no hay ninguno). Se llama con `_condicion` tomada: el valor se recalcula
+    del estado en cada cambio, así que reservas solapadas que terminan en
+    cualquier orden no dejan un límite viejo.
+    """
+    threadpool_limits(limits=max(_estado["en_uso_blas"], 1), user_api="blas")
+
+
+@contextmanager
+def reservar_cpu(
+    solicitados: int | None = None,
+    minimo: int = 1,
+    etiqueta: str = "general",
+    blas: bool = False
+):
+    """
+    Reserva hilos del presupuesto mientras dure el bloque y devuelve cuántos
+    se concedieron (usar como n_jobs). Dentro del bloque, OpenMP (KMeans y
+    otros kernels de sklearn) queda limitado a ese número de hilos en el hilo
+    que reserva; fuera de las reservas la API lo deja en uno (ver
+    src/api/main.py).
+
+    El límite de BLAS es global del proceso: con blas=True los hilos
+    concedidos se suman al límite de BLAS mientras dure la reserva.
+
+    Params:
+        solicitados: hilos deseados; None o < 1 = todo el presupuesto.
+        minimo: hilos por debajo de los cuales se espera en cola en lugar de
+            ejecutar con menos paralelismo.
+        etiqueta: nombre para las métricas (ej: "random_forest").
+        blas: el trabajo es álgebra lineal densa (numpy/scipy) que debe usar
+            los hilos reservados.
+    """
+    presupuesto = presupuesto_cpu()
+    solicitados = presupuesto if not solicitados or solicitados < 1 else min(solicitados, presupuesto)
+    minimo = min(max(minimo, 1), solicitados)
+
+    inicio = time.perf_counter()
+    with _condicion:
+        _estado["esperando"] += 1
+        try:
+            _condicion.wait_for(lambda: presupuesto - _estado["en_uso"] >= minimo)
+        finally:
+            _estado["esperando"] -= 1
+        concedidos = min(solicitados, presupuesto - _estado["en_uso"])
+        _estado["en_uso"] += concedidos
+        _registrar(etiqueta, solicitados, concedidos, time.perf_counter() - inicio)
+        if blas:
+            _estado["en_uso_blas"] += concedidos
+            _aplicar_limite_blas()
+
+    try:
+        with threadpool_limits(limits=concedidos, user_api="openmp"):
+            yield concedidos
+    finally:
+        with _condicion:
+            _estado["en_uso"] -= concedidos
+            if blas:
+                _estado["en_uso_blas"] -= concedidos
+                _aplicar_limite_blas()
+            _condicion.notify_all()
+
+
+def metricas_cpu() -> dict:
+    """Uso actual del presupuesto y, por etiqueta, reservas y tiempo en cola."""
+    with _condicion:
+        por_etiqueta = {}
+        for etiqueta, m in _metricas.items():
+            por_etiqueta[etiqueta] = dict(
+                m,
+                slots_promedio=m["slots_concedidos"] / m["reservas"],
+                espera_promedio_s=m["espera_total_s"] / m["reservas"],
+            )
+        return {
+            "presupuesto": presupuesto_cpu(),
+            "en_uso": _estado["en_uso"],
+            "esperando": _estado["esperando"],
+            "por_etiqueta": por_etiqueta,
+        }